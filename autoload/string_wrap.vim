@@ -0,0 +1,382 @@
+" Autoloaded functions of StringWrap.vim
+"
+" The Python package is imported once, when this file is first sourced, and
+" the commands call into it with py3eval. If g:string_wrap_use_server is set,
+" the commands instead send their requests to a long-running
+" `python -m string_wrap.server` job, see python/string_wrap/server.py for
+" the protocol.
+"
+" Requests to the server, and inputs larger than g:string_wrap_async_bytes,
+" are handled in the background. The result is applied from a timer, and only
+" if the buffer didn't change in the meantime.
+"
+" With g:string_wrap_stats set, the stages of the Python code and the buffer
+" reads and writes of this script are timed, see :StringWrapStats.
+
+let s:python_root_dir = fnamemodify(resolve(expand('<sfile>:p')), ':h:h') . '/python'
+let s:use_server = get(g:, 'string_wrap_use_server', 0)
+
+if !s:use_server
+python3 << endpython
+import os
+import sys
+import vim
+
+# Insert the python dir into sys.path so we can import it, but only once
+_string_wrap_dir = os.path.normpath(vim.eval("s:python_root_dir"))
+if _string_wrap_dir not in sys.path:
+    sys.path.insert(0, _string_wrap_dir)
+del _string_wrap_dir
+
+import string_wrap.vim_bridge
+endpython
+endif
+
+" Call a function of the vim_bridge module. The arguments are passed as JSON,
+" which is valid Python for the strings and numbers that we use.
+fun! s:Call(func, ...) abort
+  return py3eval('string_wrap.vim_bridge.' . a:func . '(*' . json_encode(a:000) . ')')
+endfun
+
+fun! s:Engine(args) abort
+  return empty(a:args) ? g:string_wrap_engine : a:args
+endfun
+
+fun! s:Error(msg) abort
+  echohl ErrorMsg
+  echomsg '[StringWrap] ERROR: ' . a:msg
+  echohl None
+endfun
+
+" Statistics {{{
+
+let s:stats_enabled = get(g:, 'string_wrap_stats', 0)
+" Timings of this script by stage, with at most s:max_samples samples
+let s:stats = {}
+let s:max_samples = 10000
+
+if s:stats_enabled && !s:use_server
+  call s:Call('enable_stats', 1)
+endif
+
+fun! s:Record(stage, start) abort
+  if !s:stats_enabled
+    return
+  endif
+  let l:seconds = reltimefloat(reltime(a:start))
+  if !has_key(s:stats, a:stage)
+    let s:stats[a:stage] = {'count': 0, 'total': 0.0, 'samples': []}
+  endif
+  let l:entry = s:stats[a:stage]
+  let l:entry.count += 1
+  let l:entry.total += l:seconds
+  call add(l:entry.samples, l:seconds)
+  if len(l:entry.samples) > s:max_samples
+    call remove(l:entry.samples, 0)
+  endif
+endfun
+
+" Nearest rank, as in the stats module
+fun! s:Percentile(ordered, q) abort
+  let l:idx = float2nr(ceil(a:q * len(a:ordered))) - 1
+  return a:ordered[max([0, min([len(a:ordered) - 1, l:idx])])]
+endfun
+
+fun! s:ShowStats(python_stats) abort
+  let l:rows = copy(a:python_stats)
+  for [l:stage, l:entry] in items(s:stats)
+    let l:ordered = sort(copy(l:entry.samples), 'f')
+    let l:rows['vim_' . l:stage] = [l:entry.count, l:entry.total,
+          \ s:Percentile(l:ordered, 0.5), s:Percentile(l:ordered, 0.99)]
+  endfor
+  if empty(l:rows)
+    echo s:stats_enabled ? '[StringWrap] No statistics yet'
+          \ : '[StringWrap] No statistics, set g:string_wrap_stats to enable them'
+    return
+  endif
+  echo printf('%-14s %8s %10s %9s %9s', 'stage', 'count', 'total ms', 'p50 ms', 'p99 ms')
+  for l:stage in sort(keys(l:rows))
+    let [l:count, l:total, l:p50, l:p99] = l:rows[l:stage]
+    echo printf('%-14s %8d %10.3f %9.3f %9.3f', l:stage, l:count,
+          \ l:total * 1000, l:p50 * 1000, l:p99 * 1000)
+  endfor
+endfun
+
+" }}}
+
+" Server mode {{{
+
+let s:job = v:null
+let s:next_id = 0
+" The callbacks and timeout timers of the requests that wait for a response
+let s:pending = {}
+let s:engines = []
+
+fun! s:StartServer() abort
+  if s:job isnot v:null && job_status(s:job) ==# 'run'
+    return
+  endif
+  let l:sep = has('win32') ? ';' : ':'
+  let l:path = s:python_root_dir . (empty($PYTHONPATH) ? '' : l:sep . $PYTHONPATH)
+  let l:cmd = [get(g:, 'string_wrap_python', 'python3'), '-m', 'string_wrap.server']
+  if s:stats_enabled
+    call add(l:cmd, '--stats')
+  endif
+  let s:job = job_start(
+        \ l:cmd,
+        \ {
+        \   'mode': 'nl',
+        \   'env': {'PYTHONPATH': l:path},
+        \   'out_cb': function('s:OnMessage'),
+        \   'err_cb': function('s:OnStderr'),
+        \   'exit_cb': function('s:OnExit'),
+        \ })
+  if job_status(s:job) !=# 'run'
+    let s:job = v:null
+    throw '[StringWrap] ERROR: failed to start the server'
+  endif
+  call s:Request('engines', {}, {names -> s:SetEngines(names)})
+endfun
+
+fun! s:SetEngines(names) abort
+  let s:engines = a:names
+endfun
+
+fun! s:Send(id, method, params) abort
+  let l:message = {'id': a:id, 'method': a:method, 'params': a:params}
+  call ch_sendraw(job_getchannel(s:job), json_encode(l:message) . "\n")
+endfun
+
+" Send a request to the server and call the callback with the result. The
+" request is cancelled if there is no response within the timeout.
+fun! s:Request(method, params, callback) abort
+  call s:StartServer()
+  let s:next_id += 1
+  let l:id = s:next_id
+  let l:timeout = get(g:, 'string_wrap_server_timeout', 5000)
+  let s:pending[l:id] = {
+        \ 'callback': a:callback,
+        \ 'timer': timer_start(l:timeout, {-> s:Cancel(l:id)}),
+        \ }
+  call s:Send(l:id, a:method, a:params)
+endfun
+
+" The server handles one request at a time, so a request that timed out is
+" running, or waits behind one that is. Cancelling it would only drop its
+" result, so the server is stopped instead, and the next request starts a new
+" one. The other requests that wait for a response fail with it.
+fun! s:Cancel(id) abort
+  if !has_key(s:pending, a:id)
+    return
+  endif
+  call s:StopServer()
+  call s:Error('request timed out, the server was stopped')
+endfun
+
+fun! s:StopServer() abort
+  for l:request in values(s:pending)
+    call timer_stop(l:request.timer)
+  endfor
+  let s:pending = {}
+  if s:job isnot v:null
+    call job_stop(s:job)
+  endif
+  let s:job = v:null
+endfun
+
+fun! s:OnMessage(channel, msg) abort
+  let l:response = json_decode(a:msg)
+  let l:id = get(l:response, 'id', v:null)
+  if type(l:id) != v:t_number || !has_key(s:pending, l:id)
+    if has_key(l:response, 'error')
+      call s:Error(l:response.error)
+    endif
+    return
+  endif
+  let l:request = remove(s:pending, l:id)
+  call timer_stop(l:request.timer)
+  if has_key(l:response, 'error')
+    call s:Error(l:response.error)
+  else
+    " Apply outside of the channel callback
+    call timer_start(0, {-> l:request.callback(l:response.result)})
+  endif
+endfun
+
+fun! s:OnStderr(channel, msg) abort
+  call s:Error(a:msg)
+endfun
+
+fun! s:OnExit(job, status) abort
+  if a:job isnot s:job
+    " A server that was stopped after a timeout
+    return
+  endif
+  for l:request in values(s:pending)
+    call timer_stop(l:request.timer)
+  endfor
+  if !empty(s:pending)
+    call s:Error('the server exited with status ' . a:status)
+  endif
+  let s:pending = {}
+  let s:job = v:null
+endfun
+
+" Replace lines start to end of a buffer, writing only the lines that differ
+fun! s:Replace(bufnr, start, end, lines) abort
+  let l:start_time = reltime()
+  let l:old = getbufline(a:bufnr, a:start, a:end)
+  let l:limit = min([len(l:old), len(a:lines)])
+  let l:lo = 0
+  while l:lo < l:limit && l:old[l:lo] ==# a:lines[l:lo]
+    let l:lo += 1
+  endwhile
+  let l:limit -= l:lo
+  let l:suffix = 0
+  while l:suffix < l:limit && l:old[-1 - l:suffix] ==# a:lines[-1 - l:suffix]
+    let l:suffix += 1
+  endwhile
+  let l:old_hi = len(l:old) - l:suffix
+  let l:new_hi = len(a:lines) - l:suffix
+
+  " Overwrite the lines that both blocks have, then add or delete the rest
+  let l:common = min([l:old_hi, l:new_hi]) - l:lo
+  if l:common > 0
+    call setbufline(a:bufnr, a:start + l:lo, a:lines[l:lo : l:lo + l:common - 1])
+  endif
+  if l:new_hi > l:old_hi
+    call appendbufline(a:bufnr, a:start + l:old_hi - 1, a:lines[l:old_hi : l:new_hi - 1])
+  elseif l:old_hi > l:new_hi
+    call deletebufline(a:bufnr, a:start + l:new_hi, a:start + l:old_hi - 1)
+  endif
+  call s:Record('write', l:start_time)
+endfun
+
+fun! s:GetLines(start, end) abort
+  let l:start_time = reltime()
+  let l:lines = getline(a:start, a:end)
+  call s:Record('read', l:start_time)
+  return l:lines
+endfun
+
+fun! s:ReplaceAll(bufnr, changes) abort
+  for [l:idx, l:lines] in reverse(a:changes)
+    call s:Replace(a:bufnr, l:idx + 1, l:idx + 1, l:lines)
+  endfor
+endfun
+
+" }}}
+
+" Background jobs {{{
+
+fun! s:UseAsync(bytes) abort
+  return s:use_server || a:bytes > get(g:, 'string_wrap_async_bytes', 65536)
+endfun
+
+" Run a request in the background, with the server or with a thread of the
+" embedded Python, and apply the result if the buffer didn't change
+fun! s:Start(method, params, Apply) abort
+  let l:Guarded = function('s:ApplyIfUnchanged', [bufnr('%'), b:changedtick, a:Apply])
+  if s:use_server
+    call s:Request(a:method, a:params, l:Guarded)
+    return
+  endif
+  let l:job = py3eval('string_wrap.vim_bridge.submit(' . json_encode(a:method) . ', **' . json_encode(a:params) . ')')
+  let l:state = {'job': l:job, 'callback': l:Guarded}
+  call timer_start(get(g:, 'string_wrap_poll_interval', 20), function('s:Poll', [l:state]), {'repeat': -1})
+endfun
+
+fun! s:Poll(state, timer) abort
+  let l:response = s:Call('poll', a:state.job)
+  if type(l:response) != v:t_dict
+    " Still running
+    return
+  endif
+  call timer_stop(a:timer)
+  if has_key(l:response, 'error')
+    call s:Error(l:response.error)
+  else
+    call a:state.callback(l:response.result)
+  endif
+endfun
+
+fun! s:ApplyIfUnchanged(bufnr, tick, Apply, result) abort
+  if getbufvar(a:bufnr, 'changedtick') != a:tick
+    call s:Error('the buffer changed, the result was dropped')
+    return
+  endif
+  call a:Apply(a:result)
+endfun
+
+" }}}
+
+fun! string_wrap#Wrap(args) range abort
+  let l:line = s:GetLines('.', '.')[0]
+  if s:UseAsync(strlen(l:line))
+    let l:params = {'line': l:line, 'text_width': &textwidth, 'engine': s:Engine(a:args)}
+    call s:Start('wrap', l:params, function('s:Replace', [bufnr('%'), line('.'), line('.')]))
+    return
+  endif
+  call s:Call('wrap_line', line('.'), &textwidth, s:Engine(a:args))
+endfun
+
+fun! string_wrap#Unwrap(args) range abort
+  let l:lines = s:GetLines("'<", "'>")
+  if s:UseAsync(strlen(join(l:lines, "\n")))
+    let l:params = {'lines': l:lines}
+    call s:Start('unwrap', l:params, function('s:Replace', [bufnr('%'), line("'<"), line("'>")]))
+    return
+  endif
+  call s:Call('unwrap_lines', line("'<"), line("'>"))
+endfun
+
+fun! string_wrap#Rewrap(args) range abort
+  let l:lines = s:GetLines("'<", "'>")
+  if s:UseAsync(strlen(join(l:lines, "\n")))
+    let l:params = {'lines': l:lines, 'text_width': &textwidth, 'engine': s:Engine(a:args)}
+    call s:Start('rewrap', l:params, function('s:Replace', [bufnr('%'), line("'<"), line("'>")]))
+    return
+  endif
+  call s:Call('rewrap_lines', line("'<"), line("'>"), &textwidth, s:Engine(a:args))
+endfun
+
+fun! string_wrap#WrapAll(args) abort
+  if &textwidth <= 0
+    echohl ErrorMsg | echo '[StringWrap] ERROR: textwidth is not set' | echohl None
+    return
+  endif
+  if s:UseAsync(wordcount().bytes)
+    let l:params = {'lines': s:GetLines(1, '$'), 'text_width': &textwidth, 'engine': s:Engine(a:args)}
+    call s:Start('wrap_all', l:params, function('s:ReplaceAll', [bufnr('%')]))
+    return
+  endif
+  let l:count = s:Call('wrap_all', &textwidth, s:Engine(a:args))
+  echo printf('[StringWrap] Wrapped %d string(s)', l:count)
+endfun
+
+fun! string_wrap#CompleteEngine(arglead, cmdline, cursorpos) abort
+  if s:use_server
+    " Filled in by the first response of the server
+    let l:engines = copy(s:engines)
+  else
+    let l:engines = s:Call('engines')
+  endif
+  return filter(l:engines, 'v:val =~# "^" . a:arglead')
+endfun
+
+fun! string_wrap#Stats(bang) abort
+  if a:bang
+    let s:stats = {}
+    if s:use_server
+      call s:Request('stats_reset', {}, {_ -> 0})
+    else
+      call s:Call('reset_stats')
+    endif
+    return
+  endif
+  if s:use_server
+    call s:Request('stats', {}, function('s:ShowStats'))
+  else
+    call s:ShowStats(s:Call('stats_summary'))
+  endif
+endfun
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark suite for every stage of the wrapping pipeline.
+
+Each stage (quote detection, escape translation, tokenization, line breaking
+and untranslation) and the end-to-end functions are timed on synthetic string
+literals of increasing size. There are four kinds of input: plain strings,
+f-strings with a few fields, f-strings that are dense with fields and strings
+with many escape sequences.
+
+The results are printed as a table and can be saved as JSON with --json. A
+saved file can be passed to --baseline to compare against it, in which case
+the exit status is 1 if any benchmark is slower than the baseline by more
+than the tolerance. A baseline of another engine or engine version is
+refused (exit status 2), and a baseline of another Python version only gives
+a warning.
+
+Usage: PYTHONPATH=./python/ python -m benchmarks [--json FILE]
+       [--baseline FILE] [--max-size BYTES] [--stage NAME ...]
+
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from string_wrap.wrapper import ENGINE_VERSION
+from string_wrap.wrapper import identify_start_and_quote
+from string_wrap.wrapper import make_sentences
+from string_wrap.wrapper import set_cache_size
+from string_wrap.wrapper import string_rewrap
+from string_wrap.wrapper import string_unwrap
+from string_wrap.wrapper import string_wrap
+from string_wrap.wrapper import tokenize
+from string_wrap.wrapper import translate_source
+from string_wrap.wrapper import untranslate_source
+
+from .bench_sentences import WORDS
+
+SIZES = [100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+KINDS = ["plain", "fstring", "placeholders", "escapes"]
+
+ESCAPES = ["\\n", "\\t", "\\x41", "\\u00e9", "\\N{EM DASH}", "\\\\", '\\"']
+
+INDENT = "        "
+
+# Minimum time to spend on each benchmark, to average out the noise of fast
+# benchmarks
+MIN_TIME = 0.2
+
+# Differences below this many seconds are noise, not regressions
+NOISE = 1e-6
+
+
+def make_source(size: int, kind: str, seed: int = 42) -> str:
+    """Create a string literal of (about) the given size"""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        if kind == "fstring" and rng.random() < 0.05:
+            word = "{value}"
+        elif kind == "placeholders" and rng.random() < 0.5:
+            word = rng.choice(["{a}", "{b.c}", "{d[0]!r}", "{e:>10}"])
+        elif kind == "escapes" and rng.random() < 0.3:
+            word = rng.choice(ESCAPES) + rng.choice(WORDS)
+        else:
+            word = rng.choice(WORDS)
+        parts.append(word)
+        length += len(word) + 1
+    prefix = "f" if kind in ("fstring", "placeholders") else ""
+    return prefix + '"' + " ".join(parts) + '"'
+
+
+class Case:
+    """The inputs of every stage for one source"""
+
+    def __init__(self, source: str, width: int, engine: str) -> None:
+        self.width = width
+        self.engine = engine
+        self.source = source
+        self.line = INDENT + source + ","
+        self.masked, self.table = translate_source(source)
+        self.sentences = make_sentences(
+            self.masked, width, engine, self.table
+        )[0]
+        self.wrapped = string_wrap(self.line, width, engine)
+
+
+STAGES: Dict[str, Callable[[Case], object]] = {
+    "identify": lambda c: identify_start_and_quote([c.line]),
+    "translate": lambda c: translate_source(c.source),
+    "tokenize": lambda c: tokenize(c.masked, c.table),
+    "sentences": lambda c: make_sentences(
+        c.masked, c.width, c.engine, c.table
+    ),
+    "untranslate": lambda c: untranslate_source(c.sentences, c.table),
+    "string_wrap": lambda c: string_wrap(c.line, c.width, c.engine),
+    "string_unwrap": lambda c: string_unwrap(c.wrapped),
+    "string_rewrap": lambda c: string_rewrap(c.wrapped, c.width, c.engine),
+}
+
+
+def timeit(func: Callable[[], object], max_repeat: int) -> float:
+    """Best time per call, with as many calls as fit in MIN_TIME"""
+    best = float("inf")
+    total = 0.0
+    for _ in range(max_repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        total += elapsed
+        if total > MIN_TIME:
+            break
+    return best
+
+
+def run(
+    sizes: List[int], kinds: List[str], stages: List[str], engine: str
+) -> Dict[str, float]:
+    # The memo cache would turn the repeated calls into lookups
+    set_cache_size(0)
+    results = {}
+    for kind in kinds:
+        for size in sizes:
+            case = Case(make_source(size, kind), 79, engine)
+            max_repeat = max(3, min(10_000, 100_000_000 // size))
+            for stage in stages:
+                name = f"{stage}/{kind}/{size}"
+                results[name] = timeit(
+                    lambda: STAGES[stage](case), max_repeat
+                )
+                print(f"{name:40s} {format_time(results[name])}")
+    return results
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in [("s", 1), ("ms", 1e-3), ("us", 1e-6)]:
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+
+def make_meta(engine: str) -> Dict[str, object]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "engine": engine,
+        "engine_version": ENGINE_VERSION,
+    }
+
+
+def check_meta(meta: Dict[str, object], baseline: Dict[str, object]) -> bool:
+    """Whether the results can be compared with a baseline, warns if the
+    Python version differs"""
+    for key in ("engine", "engine_version"):
+        if baseline.get(key) != meta[key]:
+            print(
+                f"The baseline has {key} {baseline.get(key)!r} instead of "
+                f"{meta[key]!r}, regenerate it with --json",
+                file=sys.stderr,
+            )
+            return False
+    python = str(baseline.get("python", "")).split(".")[:2]
+    if python != str(meta["python"]).split(".")[:2]:
+        print(
+            f"Warning: the baseline was made with Python "
+            f"{baseline.get('python')}, not {meta['python']}",
+            file=sys.stderr,
+        )
+    return True
+
+
+def compare(
+    results: Dict[str, float], baseline: Dict[str, float], tolerance: float
+) -> List[str]:
+    """Print the ratios to the baseline, and return the regressions"""
+    regressions = []
+    print()
+    print(
+        f"{'benchmark':40s} {'baseline':>11s} {'current':>11s} {'ratio':>6s}"
+    )
+    for name, seconds in results.items():
+        if name not in baseline:
+            continue
+        ratio = seconds / baseline[name]
+        flag = ""
+        if seconds > baseline[name] * (1 + tolerance) + NOISE:
+            regressions.append(name)
+            flag = " !"
+        print(
+            f"{name:40s} {format_time(baseline[name])} "
+            f"{format_time(seconds)} {ratio:6.2f}{flag}"
+        )
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark the stages of the wrapping pipeline",
+    )
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument(
+        "--baseline", help="Compare with the results in this file"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed slowdown relative to the baseline (default: "
+        "%(default)s)",
+    )
+    parser.add_argument(
+        "--max-size",
+        type=int,
+        default=SIZES[-1],
+        help="Largest input size in bytes (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--kind", choices=KINDS, action="append", help="Kinds of input"
+    )
+    parser.add_argument(
+        "--stage", choices=list(STAGES), action="append", help="Stages"
+    )
+    parser.add_argument("--engine", default="greedy")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    meta = make_meta(args.engine)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fp:
+            baseline = json.load(fp)
+        # Refuse before running the benchmarks, which takes a while
+        if not check_meta(meta, baseline.get("meta", {})):
+            return 2
+
+    sizes = [s for s in SIZES if s <= args.max_size]
+    results = run(
+        sizes, args.kind or KINDS, args.stage or list(STAGES), args.engine
+    )
+
+    if args.json:
+        data = {"meta": meta, "results": results}
+        with open(args.json, "w", encoding="utf-8") as fp:
+            json.dump(data, fp, indent=2, sort_keys=True)
+
+    if args.baseline:
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s)", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
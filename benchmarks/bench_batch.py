@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the throughput of rewrapping a repository with multiple processes.
+
+A synthetic repository of Python files with long string literals is generated
+in a temporary directory and rewrapped (without writing) with an increasing
+number of worker processes.
+
+Usage: PYTHONPATH=./python/ python -m benchmarks.bench_batch [-n FILES]
+
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from string_wrap.batch import find_files
+from string_wrap.batch import rewrap_files
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua"
+).split()
+
+TEMPLATE = """\
+def function_{i}(value):
+    if value is None:
+        raise ValueError(
+            "{message}"
+        )
+    return value + {i}
+
+"""
+
+
+def make_repo(root: str, n_files: int, seed: int = 42) -> None:
+    rng = random.Random(seed)
+    for k in range(n_files):
+        # Mix small and large files to exercise the chunking
+        n_blocks = rng.choice([5, 20, 100, 400])
+        blocks = []
+        for i in range(n_blocks):
+            message = " ".join(rng.choices(WORDS, k=rng.randint(10, 40)))
+            blocks.append(TEMPLATE.format(i=i, message=message))
+        subdir = os.path.join(root, f"pkg{k % 10}")
+        os.makedirs(subdir, exist_ok=True)
+        with open(os.path.join(subdir, f"mod{k}.py"), "w") as fp:
+            fp.write("".join(blocks))
+
+
+def run(files, jobs: int) -> float:
+    start = time.perf_counter()
+    results = rewrap_files(files, 79, write=False, jobs=jobs)
+    count = sum(r.count for r in results)
+    elapsed = time.perf_counter() - start
+    assert count > 0
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--n-files", type=int, default=400)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        make_repo(root, args.n_files)
+        files = find_files([root])
+        size = sum(os.path.getsize(f) for f in files) / 1e6
+        print(f"{len(files)} files, {size:.1f} MB")
+
+        cpus = os.cpu_count() or 1
+        jobs_list = sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1)))
+        base = None
+        for jobs in jobs_list:
+            elapsed = min(run(files, jobs) for _ in range(args.repeat))
+            base = base or elapsed
+            print(
+                f"jobs={jobs:<3d} {elapsed:8.3f} s  {size / elapsed:7.2f} MB/s"
+                f"  speedup {base / elapsed:5.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
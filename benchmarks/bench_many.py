@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the batch entry points against the single-string functions.
+
+A synthetic batch of long string lines, as found in a real code base, is
+wrapped once with wrap_many and once by calling string_wrap in a loop. A
+share of the lines are duplicates, which is common for error messages. The
+memo cache is cleared before each run so that both paths do the same work.
+
+Usage: PYTHONPATH=./python/ python -m benchmarks.bench_many
+
+"""
+
+import argparse
+import random
+import time
+
+from string_wrap import cache_clear
+from string_wrap import rewrap_many
+from string_wrap import string_rewrap
+from string_wrap import string_wrap
+from string_wrap import wrap_many
+
+from .bench_sentences import WORDS
+
+
+def make_lines(count: int, duplicates: float, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        if lines and rng.random() < duplicates:
+            lines.append(rng.choice(lines))
+            continue
+        words = [rng.choice(WORDS) for _ in range(rng.randint(10, 60))]
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), "{value}")
+            lines.append('        f"' + " ".join(words) + '",')
+        else:
+            lines.append('        "' + " ".join(words) + '",')
+    return lines
+
+
+def timeit(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        cache_clear()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-w", "--width", type=int, default=79)
+    parser.add_argument("-n", "--count", type=int, default=5_000)
+    parser.add_argument("--duplicates", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = make_lines(args.count, args.duplicates)
+    blocks = [string_wrap(line, args.width) for line in lines]
+
+    t_loop = timeit(
+        lambda: [string_wrap(line, args.width) for line in lines], args.repeat
+    )
+    t_many = timeit(lambda: wrap_many(lines, args.width), args.repeat)
+    print(
+        f"wrap:   loop {t_loop:7.3f} s  many {t_many:7.3f} s"
+        f"  speedup {t_loop / t_many:5.2f}x"
+    )
+
+    t_loop = timeit(
+        lambda: [string_rewrap(block, args.width) for block in blocks],
+        args.repeat,
+    )
+    t_many = timeit(lambda: rewrap_many(blocks, args.width), args.repeat)
+    print(
+        f"rewrap: loop {t_loop:7.3f} s  many {t_many:7.3f} s"
+        f"  speedup {t_loop / t_many:5.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the fast path for plain ASCII strings against the general pipeline.
+
+Most strings that are wrapped are short, plain, ASCII-only and without
+escapes. For these, string_wrap skips the escape translation, the tokens and
+the f-string handling. This wraps a batch of such lines once with string_wrap
+and once with the general pipeline, checks that the lines are the same and
+reports the time per line of both.
+
+Usage: PYTHONPATH=./python/ python -m benchmarks.bench_plain
+
+"""
+
+import argparse
+import random
+import time
+
+from string_wrap.wrapper import _string_wrap
+from string_wrap.wrapper import identify_start_and_quote
+from string_wrap.wrapper import translate_source
+from string_wrap.wrapper import wrap_text
+
+from .bench_sentences import WORDS
+
+
+def make_lines(count: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(10, 60))]
+        quote = rng.choice("\"'")
+        comma = "," if rng.random() < 0.5 else ""
+        lines.append("        " + quote + " ".join(words) + quote + comma)
+    return lines
+
+
+def general_wrap(line: str, text_width: int) -> list:
+    """Wrap a line with the general pipeline, as for any other string"""
+    info = identify_start_and_quote([line])
+    indent = " " * info.indent_len
+    source, table = translate_source(line.rstrip(",").strip())
+    wrapped, _ = wrap_text(source, text_width - len(indent) - 2, table)
+    lines = [indent + info.quote_str + s + info.quote_str for s in wrapped]
+    if info.trailing_comma:
+        lines[-1] += ","
+    return lines
+
+
+def timeit(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-w", "--width", type=int, default=79)
+    parser.add_argument("-n", "--count", type=int, default=5_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    lines = make_lines(args.count)
+    fast = [_string_wrap(line, args.width) for line in lines]
+    general = [general_wrap(line, args.width) for line in lines]
+    assert fast == general, "the fast path changed the output"
+
+    # The memo cache of string_wrap is bypassed, to time the wrapping itself
+    t_fast = timeit(
+        lambda: [_string_wrap(line, args.width) for line in lines],
+        args.repeat,
+    )
+    t_general = timeit(
+        lambda: [general_wrap(line, args.width) for line in lines],
+        args.repeat,
+    )
+    print(f"{'general':>10s} {t_general / len(lines) * 1e6:8.1f} us/line")
+    print(f"{'fast path':>10s} {t_fast / len(lines) * 1e6:8.1f} us/line")
+    print(f"{'speedup':>10s} {t_general / t_fast:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark rewrapping against unwrapping and wrapping the result.
+
+Blocks of wrapped lines of increasing size are rewrapped to another width
+once with string_rewrap and once by wrapping the unwrapped line, which is
+what string_rewrap did before. The lines must be the same. The best time of a
+few runs and the peak memory of one run are reported for both.
+
+Usage: PYTHONPATH=./python/ python -m benchmarks.bench_rewrap
+
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from string_wrap.wrapper import _string_rewrap
+from string_wrap.wrapper import _string_unwrap
+from string_wrap.wrapper import _string_wrap
+
+from .bench_sentences import make_source
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def round_trip(lines: list, text_width: int) -> list:
+    return _string_wrap(_string_unwrap(lines)[0], text_width)
+
+
+def measure(func, lines: list, text_width: int, repeat: int) -> tuple:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(lines, text_width)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func(lines, text_width)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-w", "--width", type=int, default=79)
+    parser.add_argument("--max-size", type=int, default=SIZES[-1])
+    args = parser.parse_args()
+
+    print(
+        f"{'size':>10s} {'kind':>7s} {'round trip':>20s} {'rewrap':>20s}"
+    )
+    for fstring in [False, True]:
+        for size in (s for s in SIZES if s <= args.max_size):
+            source = make_source(size, fstring)
+            # The block was wrapped to a narrower width before
+            lines = _string_wrap("        " + source + ",", args.width - 20)
+            assert _string_rewrap(lines, args.width) == round_trip(
+                lines, args.width
+            ), "rewrapping changed the output"
+            repeat = max(3, min(20, 1_000_000 // size))
+            results = [
+                measure(func, lines, args.width, repeat)
+                for func in (round_trip, _string_rewrap)
+            ]
+            cells = " ".join(
+                f"{t * 1e3:8.2f} ms {peak / 1e6:6.2f} MB"
+                for t, peak in results
+            )
+            kind = "fstring" if fstring else "plain"
+            print(f"{len(source):10d} {kind:>7s} {cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the scaling of the sentence builder with the size of the input.
+
+The time per megabyte should stay roughly constant as the input grows from
+1 KB to 10 MB, both for building the full list of sentences and for consuming
+the sentences one by one from the generator. Both take the fast path for plain
+strings, and the tokens for f-strings.
+
+Usage: PYTHONPATH=./python/ python -m benchmarks.bench_sentences
+
+"""
+
+import argparse
+import random
+import time
+
+from string_wrap.wrapper import iter_sentences
+from string_wrap.wrapper import make_sentences
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua"
+).split()
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+
+def make_source(size: int, fstring: bool, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    words = WORDS + ["{value}"] if fstring else WORDS
+    parts = []
+    length = 0
+    while length < size:
+        word = rng.choice(words)
+        parts.append(word)
+        length += len(word) + 1
+    prefix = "f" if fstring else ""
+    return prefix + '"' + " ".join(parts) + '"'
+
+
+def timeit(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def consume(source: str, width: int) -> None:
+    for _ in iter_sentences(source, width):
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-w", "--width", type=int, default=75)
+    parser.add_argument("--max-size", type=int, default=SIZES[-1])
+    args = parser.parse_args()
+
+    print(f"{'size':>10s} {'kind':>7s} {'list':>10s} {'generator':>10s}")
+    for fstring in [False, True]:
+        for size in (s for s in SIZES if s <= args.max_size):
+            source = make_source(size, fstring)
+            repeat = max(1, min(20, 1_000_000 // size))
+            t_list = timeit(lambda: make_sentences(source, args.width), repeat)
+            t_gen = timeit(lambda: consume(source, args.width), repeat)
+            mb = len(source) / 1e6
+            print(
+                f"{len(source):10d} {'fstring' if fstring else 'plain':>7s}"
+                f" {t_list / mb:7.3f} s/MB {t_gen / mb:7.3f} s/MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark wrapping all string lines of a buffer, as :StringWrapAll does.
+
+A buffer of lines without line endings is generated, with a long string
+literal inside brackets in every fourth line, and a triple-quoted docstring
+per function whose lines must be left alone. The scan for the eligible lines
+and the whole pass (scan and wrap) are timed separately. The memo cache is
+bypassed, as every string is different.
+
+Usage: PYTHONPATH=./python/ python -m benchmarks.bench_wrap_all [-n LINES]
+
+"""
+
+import argparse
+import random
+import time
+
+from string_wrap.batch import find_changes
+from string_wrap.batch import find_string_lines
+
+from .bench_batch import WORDS
+
+TEMPLATE = [
+    "def function_{i}(value):",
+    '    """Check the value with check(',
+    '    "{message}",',
+    '    """',
+    "    if value is None:",
+    "        raise ValueError(",
+    '            "{message}"',
+    "        )",
+    "    return value + {i}",
+    "",
+]
+
+
+def make_buffer(n_lines: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    lines = []
+    i = 0
+    while len(lines) < n_lines:
+        message = " ".join(rng.choices(WORDS, k=rng.randint(15, 40)))
+        lines.extend(t.format(i=i, message=message) for t in TEMPLATE)
+        i += 1
+    return lines[:n_lines]
+
+
+def best_of(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--lines", type=int, default=20_000)
+    parser.add_argument("-w", "--width", type=int, default=79)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = make_buffer(args.lines)
+    count = len(find_changes(lines, args.width))
+    t_scan = best_of(
+        lambda: find_string_lines(lines, args.width), args.repeat
+    )
+    # The wrapping engine caches its results, a new buffer is made per run
+    buffers = [make_buffer(args.lines, seed) for seed in range(args.repeat)]
+    t_all = min(
+        best_of(lambda: find_changes(buf, args.width), 1) for buf in buffers
+    )
+    print(f"{len(lines)} lines, {count} strings wrapped")
+    print(f"{'scan':>6s} {t_scan * 1e3:8.1f} ms")
+    print(f"{'total':>6s} {t_all * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
 # -*- coding: utf-8 -*-
 
+from .wrapper import cache_clear
+from .wrapper import cache_info
+from .wrapper import rewrap_many
 from .wrapper import string_rewrap
 from .wrapper import string_unwrap
 from .wrapper import string_wrap
+from .wrapper import unwrap_many
+from .wrapper import wrap_many
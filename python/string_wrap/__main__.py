@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+Command line interface for rewrapping long string literals in files.
+
+Usage: python -m string_wrap [-w WIDTH] [-j JOBS] [--check] PATH [PATH ...]
+
+License: See LICENSE file
+
+"""
+
+import argparse
+import sqlite3
+import sys
+
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from .batch import find_files
+from .batch import rewrap_files
+from .cache import ResultCache
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m string_wrap",
+        description="Wrap string literals that are longer than the maximum "
+        "line width",
+    )
+    parser.add_argument(
+        "-w",
+        "--width",
+        type=int,
+        default=79,
+        help="Maximum line width (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Don't write the files, exit with status 1 if any file would "
+        "be changed",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory of the result cache (default: "
+        "$XDG_CACHE_HOME/string_wrap)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't use the result cache",
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="Don't report changes"
+    )
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        metavar="PATH",
+        help="Files to rewrap, directories are searched for Python files",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    files = find_files(args.paths)
+    cache = None if args.no_cache else _open_cache(args.cache_dir)
+    try:
+        changed, failed = _run(files, args, cache)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    if failed:
+        return 2
+    return 1 if (args.check and changed) else 0
+
+
+def _open_cache(cache_dir: Optional[str]) -> Optional[ResultCache]:
+    """Open the result cache, or return None if that fails"""
+    try:
+        return ResultCache(cache_dir)
+    except (OSError, sqlite3.Error) as err:
+        print(
+            f"[StringWrap] WARNING: not using the cache: {err}",
+            file=sys.stderr,
+        )
+        return None
+
+
+def _run(
+    files: List[str], args: argparse.Namespace, cache: Optional[ResultCache]
+) -> Tuple[int, int]:
+    results = rewrap_files(
+        files, args.width, write=not args.check, jobs=args.jobs, cache=cache
+    )
+
+    changed = 0
+    failed = 0
+    for result in results:
+        if result.error is not None:
+            failed += 1
+            print(
+                f"[StringWrap] ERROR: {result.path}: {result.error}",
+                file=sys.stderr,
+            )
+            continue
+        if not result.count:
+            continue
+        changed += 1
+        if not args.quiet:
+            verb = "Would rewrap" if args.check else "Rewrapped"
+            print(f"{verb} {result.count} string(s) in {result.path}")
+    return changed, failed
+
+
+if __name__ == "__main__":
+    sys.exit(main())
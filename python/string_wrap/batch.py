@@ -0,0 +1,437 @@
+# -*- coding: utf-8 -*-
+
+"""
+Rewrap all over-long string literals in a file or a repository.
+
+This module applies the same wrapping that the Vim plugin uses to every
+eligible line in a file in a single pass. A line is eligible if it consists of
+a single (f-)string literal (optionally followed by a comma) that is longer
+than the requested width, and if it is part of a bracketed expression, so that
+the wrapped lines are concatenated implicitly by Python.
+
+Many files can be processed in parallel with a process pool. Files are
+distributed over the workers in chunks of roughly equal size in bytes, and the
+results are returned in the order of the input files. Optionally, results are
+stored in a persistent cache (see the cache module), so that files that
+haven't changed since a previous run are skipped.
+
+License: See LICENSE file
+
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from itertools import accumulate
+
+from .width import display_width
+from .wrapper import DEFAULT_ENGINE
+from .wrapper import wrap_many
+
+# The process pool, the cache and tempfile are imported when they are used,
+# as the Vim plugin only needs the line scanner of this module
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Iterable
+    from typing import Iterator
+    from typing import List
+    from typing import Optional
+    from typing import Tuple
+
+    from .cache import ResultCache
+
+# A line that holds nothing but a single-line string literal, with an optional
+# f-prefix and an optional trailing comma. Triple-quoted strings are excluded.
+_STRING_LINE_RE = re.compile(
+    r"""^[ ]*f?(?:"(?!"")(?:[^"\\]|\\.)*"|'(?!'')(?:[^'\\]|\\.)*'),?$"""
+)
+
+# The tokens that matter to find the lines inside brackets: strings (which can
+# span several lines), comments and brackets. Escapes can't end a string, in
+# raw strings neither, so the string prefixes don't matter.
+_SCAN_RE = re.compile(
+    r"'''[^'\\]*(?:(?:\\.|'(?!''))[^'\\]*)*(?:'''|\Z)"
+    r'|"""[^"\\]*(?:(?:\\.|"(?!""))[^"\\]*)*(?:"""|\Z)'
+    r"|'[^'\\\n]*(?:\\.[^'\\\n]*)*'?"
+    r'|"[^"\\\n]*(?:\\.[^"\\\n]*)*"?'
+    r"|#[^\n]*"
+    r"|[()\[\]{}]",
+    re.DOTALL,
+)
+_OPENING = "([{"
+_CLOSING = ")]}"
+
+# Bounds on the number of bytes of source code sent to a worker at once
+MIN_CHUNK_BYTES = 32 * 1024
+MAX_CHUNK_BYTES = 4 * 1024 * 1024
+
+
+class FileResult:
+    __slots__ = ("path", "count", "error", "digest", "output")
+
+    def __init__(
+        self,
+        path: str,
+        count: int,
+        error: Optional[str] = None,
+        digest: Optional[str] = None,
+        output: Optional[str] = None,
+    ) -> None:
+        self.path = path
+        self.count = count
+        self.error = error
+        # Only set when the result is needed for the cache
+        self.digest = digest
+        self.output = output
+
+    def __repr__(self) -> str:
+        return (
+            f"FileResult(path={self.path!r}, count={self.count}, "
+            f"error={self.error!r})"
+        )
+
+
+def is_string_line(line: str) -> bool:
+    """Check whether a line consists of a single string literal"""
+    return _STRING_LINE_RE.match(line) is not None
+
+
+def _split_eol(line: str) -> Tuple[str, str]:
+    body = line.rstrip("\r\n")
+    return body, line[len(body) :]
+
+
+def _split_lines(source: str) -> List[str]:
+    # Unlike str.splitlines, only split on newlines, so that form feeds and
+    # other separators inside string literals are left alone.
+    lines = [line + "\n" for line in source.split("\n")]
+    lines[-1] = lines[-1][:-1]
+    if not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def find_string_lines(lines: List[str], text_width: int) -> List[int]:
+    """Find the indices of the eligible string lines in a list of lines
+
+    The lines that look like a long string line are found first. Only if
+    there are any, the source is scanned for strings, comments and brackets,
+    so that the lines of a triple-quoted string are never mistaken for string
+    lines, and the lines outside of brackets are left alone.
+    """
+    candidates = []
+    for idx, line in enumerate(lines):
+        # A character takes at most two columns, most lines are too short
+        if 2 * len(line) <= text_width:
+            continue
+        code = line.rstrip()
+        if is_string_line(code) and display_width(code) > text_width:
+            candidates.append(idx)
+    if not candidates:
+        return []
+
+    # The source is only needed up to the last candidate
+    texts = [
+        line if line.endswith("\n") else line + "\n"
+        for line in lines[: candidates[-1] + 1]
+    ]
+    starts = [0]
+    starts.extend(accumulate(map(len, texts)))
+    offsets = [starts[idx] for idx in candidates]
+    source = "".join(texts)
+
+    indices = []
+    depth = 0
+    pos = 0
+    for match in _SCAN_RE.finditer(source):
+        start = match.start()
+        # The candidates before this token start outside of any string
+        while pos < len(offsets) and offsets[pos] <= start:
+            if depth > 0:
+                indices.append(candidates[pos])
+            pos += 1
+        if pos == len(offsets):
+            break
+        char = source[start]
+        if char in _OPENING:
+            depth += 1
+        elif char in _CLOSING:
+            depth = max(depth - 1, 0)
+        else:
+            # The candidates that start inside a string are not string lines
+            end = match.end()
+            while pos < len(offsets) and offsets[pos] < end:
+                pos += 1
+    if depth > 0:
+        indices.extend(candidates[pos:])
+    return indices
+
+
+def find_changes(
+    lines: List[str], text_width: int, engine: str = DEFAULT_ENGINE
+) -> List[Tuple[int, List[str]]]:
+    """Compute the wrapped version of all eligible string lines
+
+    Returns the index of every line that changes together with the lines that
+    replace it, in the order of the input. The replacement lines don't have
+    line endings. Strings that can't be wrapped are left alone.
+    """
+    indices = find_string_lines(lines, text_width)
+    codes = [lines[idx].rstrip() for idx in indices]
+    changes = []
+    for idx, code, result in zip(
+        indices, codes, wrap_many(codes, text_width, engine)
+    ):
+        if result.lines is not None and result.lines != [code]:
+            changes.append((idx, result.lines))
+    return changes
+
+
+def rewrap_lines(lines: List[str], text_width: int) -> Tuple[List[str], int]:
+    """Wrap all eligible string lines in a list of lines
+
+    The lines may contain line endings, which are preserved. Returns the new
+    list of lines and the number of string literals that were wrapped.
+    """
+    changes = find_changes(lines, text_width)
+    if not changes:
+        return lines, 0
+    output = []
+    prev = 0
+    for idx, wrapped in changes:
+        eol = _split_eol(lines[idx])[1]
+        output.extend(lines[prev:idx])
+        output.extend(w + eol for w in wrapped)
+        prev = idx + 1
+    output.extend(lines[prev:])
+    return output, len(changes)
+
+
+def rewrap_source(source: str, text_width: int) -> Tuple[str, int]:
+    """Wrap all eligible string lines in the source text of a file"""
+    lines, count = rewrap_lines(_split_lines(source), text_width)
+    if not count:
+        return source, 0
+    return "".join(lines), count
+
+
+def atomic_write(path: str, text: str) -> None:
+    """Write text to a file by atomically replacing it
+
+    The new contents are written to a temporary file in the same directory,
+    which is then moved over the original file. The file mode is preserved.
+    """
+    import tempfile
+
+    dirname = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=dirname, prefix=".string_wrap-", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as fp:
+            fp.write(text)
+            fp.flush()
+            os.fsync(fp.fileno())
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as fp:
+        return fp.read()
+
+
+def rewrap_file(path: str, text_width: int, write: bool = True) -> int:
+    """Wrap all eligible string lines in a file
+
+    Returns the number of string literals that were (or, if ``write`` is
+    False, would be) wrapped.
+    """
+    return _rewrap_data(path, _read_file(path), text_width, write)[1]
+
+
+def _rewrap_data(
+    path: str, data: bytes, text_width: int, write: bool
+) -> Tuple[str, int]:
+    # Decoding the bytes keeps the line endings, like newline="" would
+    new_source, count = rewrap_source(data.decode("utf-8"), text_width)
+    if count and write:
+        atomic_write(path, new_source)
+    return new_source, count
+
+
+def find_files(paths: Iterable[str]) -> List[str]:
+    """Expand directories to the Python files they contain
+
+    Hidden directories are skipped. Files that are given explicitly are
+    returned as is, regardless of their extension.
+    """
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            files.extend(
+                os.path.join(dirpath, f)
+                for f in sorted(filenames)
+                if f.endswith(".py")
+            )
+    return files
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def make_chunks(
+    paths: List[str], jobs: int, chunk_bytes: Optional[int] = None
+) -> List[List[str]]:
+    """Split the files into consecutive chunks of roughly equal total size
+
+    If ``chunk_bytes`` is not given, it is chosen such that each worker
+    receives several chunks, which keeps the workers busy when the file sizes
+    are uneven.
+    """
+    sizes = [_file_size(p) for p in paths]
+    if chunk_bytes is None:
+        chunk_bytes = sum(sizes) // (8 * jobs)
+        chunk_bytes = max(MIN_CHUNK_BYTES, min(MAX_CHUNK_BYTES, chunk_bytes))
+
+    chunks = []
+    chunk: List[str] = []
+    total = 0
+    for path, size in zip(paths, sizes):
+        chunk.append(path)
+        total += size
+        if total >= chunk_bytes:
+            chunks.append(chunk)
+            chunk = []
+            total = 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _rewrap_one(
+    path: str, text_width: int, write: bool, keep: bool = False
+) -> FileResult:
+    try:
+        data = _read_file(path)
+        new_source, count = _rewrap_data(path, data, text_width, write)
+    except (OSError, UnicodeDecodeError) as err:
+        return FileResult(path, 0, error=str(err))
+    if not keep:
+        return FileResult(path, count)
+    from .cache import hash_bytes
+
+    return FileResult(
+        path,
+        count,
+        digest=hash_bytes(data),
+        output=new_source if count else None,
+    )
+
+
+def _rewrap_chunk(
+    args: Tuple[List[str], int, bool, bool]
+) -> List[FileResult]:
+    paths, text_width, write, keep = args
+    return [_rewrap_one(path, text_width, write, keep) for path in paths]
+
+
+def rewrap_files(
+    paths: List[str],
+    text_width: int,
+    write: bool = True,
+    jobs: Optional[int] = None,
+    chunk_bytes: Optional[int] = None,
+    cache: Optional[ResultCache] = None,
+) -> Iterator[FileResult]:
+    """Wrap all eligible string lines in many files
+
+    With ``jobs`` larger than one the files are processed by a pool of worker
+    processes (``None`` uses all CPUs). Results are yielded as soon as they
+    are available, in the same order as the input paths. If a cache is given,
+    files with a cached result are not parsed, and new results are added to
+    the cache.
+    """
+    if cache is None:
+        yield from _rewrap_files(
+            paths, text_width, write, jobs, chunk_bytes, False
+        )
+        return
+
+    from .cache import hash_bytes
+    from .cache import make_key
+
+    cached: List[Optional[FileResult]] = []
+    for path in paths:
+        try:
+            data = _read_file(path)
+        except OSError:
+            # Let the worker report the error
+            cached.append(None)
+            continue
+        entry = cache.get(make_key(hash_bytes(data), text_width))
+        if entry is None:
+            cached.append(None)
+            continue
+        count, output = entry
+        if count and write:
+            atomic_write(path, output)
+        cached.append(FileResult(path, count))
+
+    todo = [path for path, result in zip(paths, cached) if result is None]
+    computed = _rewrap_files(todo, text_width, write, jobs, chunk_bytes, True)
+    for result in cached:
+        if result is None:
+            result = next(computed)
+            if result.error is None:
+                key = make_key(result.digest, text_width)
+                cache.put(key, result.count, result.output)
+            result.digest = result.output = None
+        yield result
+
+
+def _rewrap_files(
+    paths: List[str],
+    text_width: int,
+    write: bool,
+    jobs: Optional[int],
+    chunk_bytes: Optional[int],
+    keep: bool,
+) -> Iterator[FileResult]:
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield _rewrap_one(path, text_width, write, keep)
+        return
+
+    chunks = make_chunks(paths, jobs, chunk_bytes=chunk_bytes)
+    if len(chunks) == 1:
+        yield from _rewrap_chunk((chunks[0], text_width, write, keep))
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    jobs = min(jobs, len(chunks))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        tasks = ((chunk, text_width, write, keep) for chunk in chunks)
+        for results in executor.map(_rewrap_chunk, tasks):
+            yield from results
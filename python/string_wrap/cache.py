@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+"""
+Persistent cache of per-file rewrap results.
+
+Results are keyed by the hash of the file contents, the line width, and the
+engine version, so that files that didn't change since the previous run can be
+skipped without parsing them. The cache is stored in an SQLite database and is
+kept below a maximum size by evicting the least recently used entries.
+
+License: See LICENSE file
+
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+from .wrapper import ENGINE_VERSION
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Approximate storage overhead of an entry, besides the output text
+ENTRY_OVERHEAD = 128
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    output TEXT,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "string_wrap")
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_key(digest: str, text_width: int) -> str:
+    return f"{digest}:{text_width}:{ENGINE_VERSION}"
+
+
+class ResultCache:
+    """LRU cache of rewrap results stored on disk
+
+    Each entry holds the number of strings that were wrapped in a file and,
+    if that number is nonzero, the new contents of the file. Lookups and
+    insertions are kept in memory until :meth:`close` is called, which writes
+    them to disk and evicts old entries if the cache is too large.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.path = os.path.join(self.cache_dir, "results.sqlite3")
+        self.hits = 0
+        self.misses = 0
+        self._used: Dict[str, float] = {}
+        self._new: Dict[str, Tuple[int, Optional[str]]] = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        try:
+            self._conn = self._connect()
+        except sqlite3.DatabaseError:
+            # Corrupted database, start over
+            os.unlink(self.path)
+            self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute(_SCHEMA)
+        conn.commit()
+        return conn
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get(self, key: str) -> Optional[Tuple[int, Optional[str]]]:
+        """Return the (count, output) pair for a key, or None if missing"""
+        entry = self._new.get(key)
+        if entry is None:
+            row = self._conn.execute(
+                "SELECT count, output FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                entry = (row[0], row[1])
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used[key] = time.time()
+        return entry
+
+    def put(self, key: str, count: int, output: Optional[str]) -> None:
+        self._new[key] = (count, output if count else None)
+
+    def flush(self) -> None:
+        """Write pending entries to disk and enforce the size limit"""
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+            (
+                (k, c, o, ENTRY_OVERHEAD + len(o or ""), now)
+                for k, (c, o) in self._new.items()
+            ),
+        )
+        self._conn.executemany(
+            "UPDATE results SET last_used = ? WHERE key = ?",
+            ((t, k) for k, t in self._used.items() if k not in self._new),
+        )
+        self._new.clear()
+        self._used.clear()
+        self._evict()
+        self._conn.commit()
+
+    def _evict(self) -> None:
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM results ORDER BY last_used ASC"
+        ).fetchall()
+        evict = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evict.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM results WHERE key = ?", evict)
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""
+Greedy line breaking with NumPy, for strings with very many tokens.
+
+The tokens of a TokenList are consecutive in its text, so the columns of the
+tokens are the prefix sums of their widths. For every token, the token before
+which the greedy engine breaks a sentence that starts with it is found with
+searchsorted on these columns, for all tokens at once. What is left for the
+Python loop is to follow these breaks from the first token, which takes one
+step per sentence instead of one per token.
+
+The sentences are the same as those of wrapper.break_tokens. NumPy is
+optional, wrapper.break_tokens only uses this module when it is installed and
+the string has many tokens.
+
+License: See LICENSE file
+
+"""
+
+from array import array
+
+from typing import Iterator
+from typing import Tuple
+
+import numpy as np
+
+from .wrapper import Kind
+from .wrapper import TokenList
+
+
+def break_tokens(tokens: TokenList, width: int) -> Iterator[Tuple[str, int]]:
+    """Greedily combine tokens into sentences of at most the given width"""
+    text = tokens.text
+    n = len(tokens)
+    breaks, kinds, first_fits = _find_breaks(tokens, width)
+    starts = tokens.starts[:]
+    starts.append(len(text))
+
+    # The first token gets a sentence of its own, after an empty one, if it
+    # doesn't fit
+    if not first_fits:
+        yield "", Kind.REGULAR
+
+    s = 0
+    while s < n:
+        b = breaks[s]
+        yield text[starts[s] : starts[b]], kinds[s]
+        s = b
+
+
+def _find_breaks(
+    tokens: TokenList, width: int
+) -> Tuple[array, bytearray, bool]:
+    """Return the break and the kind of a sentence that starts at each token,
+    and whether the first token fits
+
+    Following the breaks is faster with arrays than with NumPy arrays or
+    lists. The NumPy arrays are freed on return, as they take more memory
+    than the text while the sentences are yielded.
+    """
+    text = tokens.text
+    n = len(tokens)
+    if text.isascii():
+        # The columns are the offsets
+        columns = np.empty(n + 1, dtype=np.int64)
+        columns[:n] = np.frombuffer(tokens.starts, dtype=np.uintc)
+        columns[n] = len(text)
+    else:
+        columns = np.array(tokens.columns(), dtype=np.int64)
+    flags = np.frombuffer(tokens.flags, dtype=np.uint8)
+    is_format = flags & Kind.FORMAT != 0
+
+    # A sentence that starts with token s is broken before the first token i
+    # after s for which columns[i + 1] - columns[s] exceeds the width. The
+    # last token can't exceed the width, so the maximum is n (no break).
+    after = np.arange(1, n + 1, dtype=np.int64)
+    breaks = np.searchsorted(columns, columns[:n] + width, side="right")
+    breaks -= 1
+    np.maximum(breaks, after, out=breaks)
+    if is_format.any():
+        # The width is one less once the sentence has a format token, so
+        # from the first format token at or after s on the break is found
+        # with the reduced width.
+        next_format = np.where(is_format, after - 1, n)
+        next_format = np.minimum.accumulate(next_format[::-1])[::-1]
+        reduced = np.searchsorted(
+            columns, columns[:n] + width - 1, side="right"
+        )
+        reduced -= 1
+        np.maximum(reduced, after, out=reduced)
+        np.maximum(reduced, next_format, out=reduced)
+        breaks = np.where(next_format < breaks, reduced, breaks)
+        kinds = bytearray(next_format < breaks)
+    else:
+        kinds = bytearray(n)
+    np.minimum(breaks, n, out=breaks)
+
+    sentence_breaks = array("q")
+    sentence_breaks.frombytes(memoryview(breaks.astype(np.int64)).cast("B"))
+    first_width = width - 1 if flags[0] & Kind.FORMAT else width
+    first_fits = bool(columns[1] - columns[0] <= first_width)
+    return sentence_breaks, kinds, first_fits
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+
+"""
+Lexer for single-line string literals and f-strings.
+
+The lexer splits the content of a string literal into literal parts and
+replacement fields (the ``{...}`` parts of an f-string) in a single linear
+scan, without building a syntax tree. Parts are reported as offsets into the
+content, so that callers can slice the source text directly.
+
+License: See LICENSE file
+
+"""
+
+from __future__ import annotations
+
+import re
+
+from bisect import bisect_right
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Dict
+    from typing import Iterator
+    from typing import List
+    from typing import Optional
+    from typing import Tuple
+
+LITERAL = 0
+FIELD = 1
+
+# The regular expressions are compiled on first use, see _regex, as compiling
+# them all takes a large part of the import time.
+
+# Characters that need attention in the content of a string literal, by quote
+# character and by whether it's an f-string.
+_SPECIAL = {
+    (q, f): r"[\\" + q + ("{}" if f else "") + "]"
+    for q in "'\""
+    for f in (False, True)
+}
+
+# Characters that need attention in the expression of a replacement field
+_FIELD_SPECIAL = r"""[\\'"{}()\[\]:]"""
+
+# Characters that need attention in a format specification, by quote character
+_SPEC_SPECIAL = {q: "[{}" + q + "]" for q in "'\""}
+
+_OPENING = {"(": ")", "[": "]", "{": "}"}
+
+# An escape sequence. Sequences that Python doesn't know are a backslash and
+# the next character, which are also kept together.
+_ESCAPE_PATTERN = (
+    r"\\(?:N\{[^}]*\}|x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}"
+    r"|[0-7]{1,3}|.)"
+)
+
+# An escape sequence or a (doubled) brace, by whether the braces are doubled
+_BRACE_PATTERNS = {
+    False: _ESCAPE_PATTERN + r"|[{}]",
+    True: _ESCAPE_PATTERN + r"|\{\{|\}\}",
+}
+
+_REGEXES: Dict[str, re.Pattern] = {}
+
+# Placeholder for spaces inside escape sequences (a noncharacter)
+PLACEHOLDER = "\uffff"
+
+
+class TokenizeError(Exception):
+    def __init__(self, source: str, reason: str) -> None:
+        self._source = source
+        self._reason = reason
+
+    def __repr__(self) -> str:
+        return (
+            f"TokenizeError(source={self._source!r}, reason={self._reason!r})"
+        )
+
+    def __str__(self) -> str:
+        return self._reason
+
+
+class EscapeMap:
+    """Sorted offsets of the escape sequences in the content of a literal
+
+    Escape sequences (``\\n``, ``\\x41``, ``\\N{EM DASH}``, etc.) are
+    treated as units that should never be broken. The map is built with a
+    single regex scan, and lookups use binary search.
+    """
+
+    __slots__ = ("starts", "ends", "masked")
+
+    def __init__(self, content: str) -> None:
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        # Number of spaces replaced by the placeholder in mask()
+        self.masked = 0
+        if "\\" not in content:
+            return
+        for m in _regex(_ESCAPE_PATTERN).finditer(content):
+            self.starts.append(m.start())
+            self.ends.append(m.end())
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def find(self, pos: int) -> int:
+        """Return the end of the escape sequence containing pos, or -1"""
+        i = bisect_right(self.starts, pos) - 1
+        if i >= 0 and pos < self.ends[i]:
+            return self.ends[i]
+        return -1
+
+    def mask(self, content: str) -> str:
+        """Replace the spaces inside escape sequences with a placeholder"""
+        parts = []
+        last = 0
+        for start, end in zip(self.starts, self.ends):
+            unit = content[start:end]
+            if " " not in unit:
+                continue
+            parts.append(content[last:start])
+            parts.append(unit.replace(" ", PLACEHOLDER))
+            self.masked += unit.count(" ")
+            last = end
+        if not parts:
+            return content
+        parts.append(content[last:])
+        return "".join(parts)
+
+
+def split_literal(source: str) -> Tuple[bool, str, str]:
+    """Split a string literal into the f-prefix flag, quote, and content"""
+    is_fstring = source.startswith("f")
+    body = source[1:] if is_fstring else source
+    if len(body) < 2 or body[0] not in "'\"" or body[-1] != body[0]:
+        raise TokenizeError(source, "not a string literal")
+    return is_fstring, body[0], body[1:-1]
+
+
+def iter_parts(
+    content: str,
+    quote: str,
+    is_fstring: bool,
+    escapes: Optional[EscapeMap] = None,
+) -> Iterator[Tuple[int, int, int]]:
+    """Iterate over the parts of the content of a string literal
+
+    Yields tuples ``(kind, start, end)`` where kind is LITERAL or FIELD, and
+    start and end are offsets into the content. Escape sequences and doubled
+    braces are part of the literal parts. Raises TokenizeError if the
+    content is not valid for the given quote character.
+    """
+    if escapes is None:
+        escapes = EscapeMap(content)
+    special = _regex(_SPECIAL[quote, is_fstring])
+    n = len(content)
+    start = pos = 0
+    while True:
+        m = special.search(content, pos)
+        if m is None:
+            break
+        i = m.start()
+        c = content[i]
+        if c == "\\":
+            # Skip the escape sequence, this also skips the braces of a named
+            # unicode escape
+            pos = escapes.find(i)
+            if pos < 0:
+                raise TokenizeError(content, "unterminated string")
+        elif c == quote:
+            raise TokenizeError(content, "unescaped quote character")
+        elif content.startswith(c, i + 1):
+            # Doubled brace
+            pos = i + 2
+        elif c == "}":
+            raise TokenizeError(content, "single '}' is not allowed")
+        else:
+            if i > start:
+                yield LITERAL, start, i
+            end = find_field_end(content, i, quote)
+            yield FIELD, i, end
+            start = pos = end
+    if start < n:
+        yield LITERAL, start, n
+
+
+def find_field_end(content: str, start: int, quote: str) -> int:
+    """Return the offset after the replacement field that starts at start
+
+    This handles brackets and strings inside the expression, and format
+    specifications that contain nested replacement fields.
+    """
+    special = _regex(_FIELD_SPECIAL)
+    closing = []
+    pos = start + 1
+    while True:
+        m = special.search(content, pos)
+        if m is None:
+            raise TokenizeError(content, "unterminated replacement field")
+        i = m.start()
+        c = content[i]
+        pos = i + 1
+        if c in _OPENING:
+            closing.append(_OPENING[c])
+        elif c in ")]}":
+            if closing:
+                if closing.pop() != c:
+                    raise TokenizeError(content, "mismatched brackets")
+            elif c == "}":
+                return pos
+            else:
+                raise TokenizeError(content, "mismatched brackets")
+        elif c == quote or c == "\\":
+            raise TokenizeError(content, "invalid replacement field")
+        elif c in "'\"":
+            # String inside the expression
+            pos = content.find(c, pos) + 1
+            if not pos:
+                raise TokenizeError(content, "unterminated string")
+        elif not closing:
+            # A colon outside brackets starts the format specification
+            return _find_spec_end(content, pos, quote)
+
+
+def _find_spec_end(content: str, pos: int, quote: str) -> int:
+    special = _regex(_SPEC_SPECIAL[quote])
+    while True:
+        m = special.search(content, pos)
+        if m is None or m.group() == quote:
+            raise TokenizeError(content, "invalid format specification")
+        if m.group() == "}":
+            return m.end()
+        pos = find_field_end(content, m.start(), quote)
+
+
+def escape_braces(text: str) -> str:
+    """Double the braces in plain string content for use in an f-string"""
+    if "{" not in text and "}" not in text:
+        return text
+    return _regex(_BRACE_PATTERNS[False]).sub(_double_brace, text)
+
+
+def unescape_braces(text: str) -> str:
+    """Undouble the braces in f-string content for use in a plain string"""
+    if "{" not in text and "}" not in text:
+        return text
+    return _regex(_BRACE_PATTERNS[True]).sub(_single_brace, text)
+
+
+def _regex(pattern: str) -> re.Pattern:
+    regex = _REGEXES.get(pattern)
+    if regex is None:
+        regex = _REGEXES[pattern] = re.compile(pattern, re.DOTALL)
+    return regex
+
+
+def _double_brace(m: "re.Match") -> str:
+    s = m.group()
+    return s if s[0] == "\\" else s + s
+
+
+def _single_brace(m: "re.Match") -> str:
+    s = m.group()
+    return s if s[0] == "\\" else s[0]
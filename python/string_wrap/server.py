@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+
+"""
+A long-running wrap worker that speaks JSON lines over stdio.
+
+Start it with ``python -m string_wrap.server``. Every line on stdin is a
+request and every line on stdout is a response::
+
+    {"id": 1, "method": "wrap", "params": {"line": ..., "text_width": 79}}
+    {"id": 1, "result": ["...", "..."]}
+
+Failures are reported as ``{"id": 1, "error": "..."}``. The methods are:
+
+    engines                                 the names of the engines
+    wrap      line, text_width, engine      see string_wrap
+    unwrap    lines                         see string_unwrap
+    rewrap    lines, text_width, engine     see string_rewrap
+    wrap_all  lines, text_width, engine     [[index, lines], ...] for every
+                                            line that changes, see
+                                            batch.find_changes
+    stats                                   {stage: [count, total, p50,
+                                            p99]}, see the stats module
+    stats_reset                             clear the statistics
+    cancel    id                            whether the request was pending
+    shutdown                                stop after the pending requests
+
+The engine is optional. The timers of the stats module are enabled with the
+--stats option. Requests are handled in order by a worker thread while the
+main thread keeps reading, so a pending request can be cancelled. A cancelled
+request gets no response. If it was already running, it keeps the worker busy
+until it finishes and only its result is dropped, so the Vim client stops the
+server instead when a request times out.
+
+License: See LICENSE file
+
+"""
+
+import argparse
+import json
+import queue
+import sys
+import threading
+
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import TextIO
+
+from . import batch
+from . import stats
+from . import wrapper
+
+
+class RequestError(Exception):
+    """An error that is reported to the client"""
+
+
+class Server:
+    def __init__(
+        self,
+        infile: TextIO,
+        outfile: TextIO,
+        cache_size: int = wrapper.DEFAULT_CACHE_SIZE,
+    ) -> None:
+        self._infile = infile
+        self._outfile = outfile
+        self._cache = wrapper.MemoCache(cache_size)
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        # Ids of the requests that are queued or running
+        self._pending: Set[Any] = set()
+        self._lock = threading.Lock()
+        self._methods: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "engines": self._engines,
+            "wrap": self._wrap,
+            "unwrap": self._unwrap,
+            "rewrap": self._rewrap,
+            "wrap_all": self._wrap_all,
+            "stats": self._stats,
+            "stats_reset": self._stats_reset,
+        }
+
+    def serve(self) -> None:
+        worker = threading.Thread(target=self._work, daemon=True)
+        worker.start()
+        for line in self._infile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as err:
+                self._send({"id": None, "error": f"Invalid JSON: {err}"})
+                continue
+            if not isinstance(request, dict):
+                self._send({"id": None, "error": "Invalid request"})
+                continue
+            method = request.get("method")
+            if method == "cancel":
+                self._handle(request, self._cancel)
+            elif method == "shutdown":
+                self._send({"id": request.get("id"), "result": True})
+                break
+            else:
+                with self._lock:
+                    self._pending.add(request.get("id"))
+                self._queue.put(request)
+        self._queue.put(None)
+        worker.join()
+
+    def _work(self) -> None:
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            with self._lock:
+                if request.get("id") not in self._pending:
+                    continue
+            method = self._methods.get(request.get("method"))
+            if method is None:
+                self._reply(
+                    request, error=f"Unknown method: {request.get('method')}"
+                )
+                continue
+            self._handle(request, method)
+
+    def _handle(
+        self,
+        request: Dict[str, Any],
+        method: Callable[[Dict[str, Any]], Any],
+    ) -> None:
+        params = request.get("params") or {}
+        try:
+            result = method(params)
+        except RequestError as err:
+            self._reply(request, error=str(err))
+        except (KeyError, TypeError, AttributeError) as err:
+            self._reply(request, error=f"Invalid params: {err!r}")
+        except ValueError as err:
+            self._reply(request, error=str(err))
+        except Exception as err:
+            # Any other error must not stop the worker thread
+            self._reply(request, error=f"Internal error: {err!r}")
+        else:
+            self._reply(request, result=result)
+
+    def _reply(
+        self,
+        request: Dict[str, Any],
+        result: Any = None,
+        error: Optional[str] = None,
+    ) -> None:
+        request_id = request.get("id")
+        if request.get("method") != "cancel":
+            with self._lock:
+                if request_id not in self._pending:
+                    # Cancelled while running
+                    return
+                self._pending.discard(request_id)
+        if error is None:
+            self._send({"id": request_id, "result": result})
+        else:
+            self._send({"id": request_id, "error": error})
+
+    def _send(self, message: Dict[str, Any]) -> None:
+        with self._lock:
+            self._outfile.write(json.dumps(message) + "\n")
+            self._outfile.flush()
+
+    def _cancel(self, params: Dict[str, Any]) -> bool:
+        with self._lock:
+            if params["id"] not in self._pending:
+                return False
+            self._pending.discard(params["id"])
+            return True
+
+    def _run(
+        self,
+        key: tuple,
+        func: Callable[..., List[wrapper.WrapResult]],
+        *args,
+    ) -> List[str]:
+        lines = self._cache.get(key)
+        if lines is None:
+            result = func(*args)[0]
+            if result.lines is None:
+                raise RequestError(result.error)
+            lines = result.lines
+            self._cache.put(key, lines)
+        return lines
+
+    def _engines(self, params: Dict[str, Any]) -> List[str]:
+        return list(wrapper.ENGINES)
+
+    def _wrap(self, params: Dict[str, Any]) -> List[str]:
+        line = str(params["line"])
+        width = int(params["text_width"])
+        engine = params.get("engine", wrapper.DEFAULT_ENGINE)
+        key = ("wrap", line, width, engine)
+        return self._run(key, wrapper.wrap_many, [line], width, engine)
+
+    def _unwrap(self, params: Dict[str, Any]) -> List[str]:
+        lines = tuple(str(line) for line in params["lines"])
+        key = ("unwrap", lines)
+        return self._run(key, wrapper.unwrap_many, [lines])
+
+    def _rewrap(self, params: Dict[str, Any]) -> List[str]:
+        lines = tuple(str(line) for line in params["lines"])
+        width = int(params["text_width"])
+        engine = params.get("engine", wrapper.DEFAULT_ENGINE)
+        key = ("rewrap", lines, width, engine)
+        return self._run(key, wrapper.rewrap_many, [lines], width, engine)
+
+    def _wrap_all(self, params: Dict[str, Any]) -> List[List[Any]]:
+        lines = [str(line) for line in params["lines"]]
+        width = int(params["text_width"])
+        engine = params.get("engine", wrapper.DEFAULT_ENGINE)
+        changes = batch.find_changes(lines, width, engine)
+        return [[idx, wrapped] for idx, wrapped in changes]
+
+    def _stats(self, params: Dict[str, Any]) -> Dict[str, List[float]]:
+        return {stage: list(s) for stage, s in stats.summary().items()}
+
+    def _stats_reset(self, params: Dict[str, Any]) -> bool:
+        stats.reset()
+        return True
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m string_wrap.server",
+        description="Answer wrap requests in JSON lines on stdin",
+    )
+    parser.add_argument(
+        "--stats", action="store_true", help="Enable the stage timers"
+    )
+    args = parser.parse_args(argv)
+    if args.stats:
+        stats.enable()
+
+    # Vim sends and expects UTF-8, whatever the locale of the job is
+    sys.stdin.reconfigure(encoding="utf-8")
+    sys.stdout.reconfigure(encoding="utf-8")
+    Server(sys.stdin, sys.stdout).serve()
+
+
+if __name__ == "__main__":
+    main()
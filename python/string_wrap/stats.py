@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+"""
+Timers for the stages of the wrapping pipeline.
+
+The timers are off by default. When they are disabled, a timed function costs
+one extra function call and a flag check. Enable them with enable() or by
+setting the STRING_WRAP_STATS environment variable, and collect the results
+with summary().
+
+Only the most recent samples of each stage are kept to compute the
+percentiles, while the count and total cover all calls.
+
+License: See LICENSE file
+
+"""
+
+from __future__ import annotations
+
+import functools
+import math
+import os
+import threading
+import time
+
+from collections import deque
+from operator import itemgetter
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Callable
+    from typing import Deque
+    from typing import Dict
+    from typing import List
+    from typing import TypeVar
+
+    F = TypeVar("F", bound=Callable)
+
+# Number of samples to keep per stage
+MAX_SAMPLES = 10_000
+
+
+class StageStats(tuple):
+    __slots__ = ()
+
+    def __new__(
+        cls, count: int, total: float, p50: float, p99: float
+    ) -> StageStats:
+        return tuple.__new__(cls, (count, total, p50, p99))
+
+    count = property(itemgetter(0))
+    total = property(itemgetter(1))
+    p50 = property(itemgetter(2))
+    p99 = property(itemgetter(3))
+
+
+class _State:
+    def __init__(self) -> None:
+        self.enabled = bool(os.environ.get("STRING_WRAP_STATS"))
+        self.counts: Dict[str, int] = {}
+        self.totals: Dict[str, float] = {}
+        self.samples: Dict[str, Deque[float]] = {}
+        self.lock = threading.Lock()
+
+
+_STATE = _State()
+
+
+def enable(enabled: bool = True) -> None:
+    _STATE.enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _STATE.enabled
+
+
+def reset() -> None:
+    with _STATE.lock:
+        _STATE.counts.clear()
+        _STATE.totals.clear()
+        _STATE.samples.clear()
+
+
+def record(stage: str, seconds: float) -> None:
+    """Add a sample for a stage, also when the timers are disabled"""
+    with _STATE.lock:
+        samples = _STATE.samples.get(stage)
+        if samples is None:
+            samples = _STATE.samples[stage] = deque(maxlen=MAX_SAMPLES)
+            _STATE.counts[stage] = 0
+            _STATE.totals[stage] = 0.0
+        samples.append(seconds)
+        _STATE.counts[stage] += 1
+        _STATE.totals[stage] += seconds
+
+
+def timed(stage: str) -> Callable[[F], F]:
+    """Decorator that records the duration of each call of a function"""
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _STATE.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(stage, time.perf_counter() - start)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    # Nearest rank
+    idx = max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))
+    return ordered[idx]
+
+
+def summary() -> Dict[str, StageStats]:
+    """Return the statistics of every stage that has samples"""
+    with _STATE.lock:
+        data = {
+            stage: (_STATE.counts[stage], _STATE.totals[stage], list(samples))
+            for stage, samples in _STATE.samples.items()
+        }
+    result = {}
+    for stage, (count, total, samples) in sorted(data.items()):
+        samples.sort()
+        result[stage] = StageStats(
+            count,
+            total,
+            _percentile(samples, 0.5),
+            _percentile(samples, 0.99),
+        )
+    return result
+
+
+def format_summary(stats: Dict[str, StageStats]) -> List[str]:
+    """Format the statistics as the lines of a table, times in milliseconds"""
+    lines = [
+        f"{'stage':14s} {'count':>8s} {'total':>10s} {'p50':>9s} {'p99':>9s}"
+    ]
+    for stage, s in stats.items():
+        lines.append(
+            f"{stage:14s} {s.count:8d} {s.total * 1e3:10.3f} "
+            f"{s.p50 * 1e3:9.3f} {s.p99 * 1e3:9.3f}"
+        )
+    return lines
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+
+"""
+Wrap a string literal that is too large to hold in memory.
+
+wrap_stream() reads a line with a string literal from a file in chunks, and
+writes each wrapped line to the output as soon as it is complete. The content
+of the literal is cut into pieces at spaces between words, outside of escape
+sequences and replacement fields, and the tokens of each piece are fed to the
+greedy breaker. The lines are the same as those of string_wrap, while only
+about a chunk of the input and one line of output are held in memory.
+
+Text without a place to cut is kept whole, so a single word (or a run of
+replacement fields that are only separated by spaces) that is larger than a
+chunk is held in memory as well. The input is validated piece by piece, so
+the lines of the pieces before an invalid part have already been written
+when the error is raised. Only the greedy engine is supported, as the optimal
+engine needs all tokens before it can break the first line.
+
+Usage: python -m string_wrap.stream [-w WIDTH] [INPUT [OUTPUT]]
+
+License: See LICENSE file
+
+"""
+
+import argparse
+import codecs
+import sys
+
+from typing import IO
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Union
+
+from .lexer import LITERAL
+from .lexer import PLACEHOLDER
+from .lexer import EscapeMap
+from .lexer import TokenizeError
+from .lexer import iter_parts
+from .lexer import unescape_braces
+from .wrapper import DEFAULT_ENGINE
+from .wrapper import GreedyBreaker
+from .wrapper import Kind
+from .wrapper import _identify_start_and_quote
+from .wrapper import get_engine
+from .wrapper import tokenize
+from .wrapper import translate_source
+
+# Number of characters (or bytes) read at once
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def wrap_stream(
+    infile: IO,
+    outfile: IO[str],
+    text_width: int,
+    engine: str = DEFAULT_ENGINE,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """Wrap the string literal on the line in infile and write it to outfile
+
+    The input can be a text or a binary file, or anything else with a read()
+    method such as a memory-mapped file. Binary input is decoded as UTF-8.
+    The input holds a single line; a final newline is ignored. The output
+    lines end with a newline. Returns the number of lines written.
+    """
+    get_engine(engine)
+    if engine != "greedy":
+        raise ValueError(f"Engine {engine!r} can't be used on a stream")
+
+    chunks = _read_chunks(infile, chunk_size)
+
+    # Read up to the opening quote to find the indent and the prefix
+    head = ""
+    for chunk in chunks:
+        head += chunk
+        if '"' in head or "'" in head:
+            break
+    info = _identify_start_and_quote([head])
+    prefix = head[: info.start_pos].lstrip()
+    if prefix not in ("", "f"):
+        raise TokenizeError(head.lstrip(), "not a string literal")
+
+    writer = _Writer(
+        outfile, " " * info.indent_len, info.quote_str, info.is_fstring
+    )
+    breaker = GreedyBreaker(text_width - info.indent_len - 2)
+    buffer = head[info.start_pos + 1 :]
+    # Buffer size at which to look for a cut. This grows while there is none,
+    # to not scan the same text over and over again.
+    threshold = chunk_size
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) < threshold or " " not in chunk:
+            continue
+        cut = _find_cut(buffer, info.quote_str, info.is_fstring)
+        if cut > 0:
+            writer.feed(breaker, prefix, buffer[:cut])
+            buffer = buffer[cut:]
+            threshold = chunk_size
+        else:
+            threshold = 2 * len(buffer)
+
+    # The rest of the line ends with the closing quote and an optional comma
+    for newline in ("\r\n", "\n"):
+        if buffer.endswith(newline):
+            buffer = buffer[: -len(newline)]
+            break
+    trailing_comma = buffer.endswith(",")
+    buffer = buffer.rstrip(",").rstrip()
+    if not buffer.endswith(info.quote_str):
+        raise TokenizeError(buffer, "not a string literal")
+    if len(buffer) > 1 or not writer.fed:
+        # An empty literal still has a token, but an empty rest doesn't
+        writer.feed(breaker, prefix, buffer[:-1])
+    writer.write(*breaker.finish())
+    writer.close(trailing_comma)
+    return writer.count
+
+
+def _read_chunks(infile: IO, size: int) -> Iterator[str]:
+    decoder = None
+    while True:
+        data = infile.read(size)
+        if not data:
+            break
+        if not isinstance(data, str):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder("utf-8")()
+            data = decoder.decode(data)
+        yield data
+    if decoder is not None:
+        data = decoder.decode(b"", final=True)
+        if data:
+            yield data
+
+
+def _find_cut(content: str, quote: str, is_fstring: bool) -> int:
+    """Return an offset in the content where it can be cut, or 0
+
+    The content may end in the middle of an escape sequence or a field. It
+    is cut after a space that ends a word of the literal text. The word must
+    not be a replacement field, as the space after a field belongs to its
+    token, and a run of spaces after a field is collapsed.
+    """
+    escapes = EscapeMap(content)
+    literals = []
+    try:
+        for kind, start, end in iter_parts(
+            content, quote, is_fstring, escapes
+        ):
+            if kind == LITERAL:
+                literals.append((start, end))
+    except TokenizeError:
+        # The rest is incomplete (or invalid, which is found when it is
+        # tokenized)
+        pass
+
+    for start, end in reversed(literals):
+        pos = content.rfind(" ", start, end)
+        while pos > start:
+            if content[pos - 1] not in " }" and _outside_escapes(
+                content, escapes, pos
+            ):
+                return pos + 1
+            pos = content.rfind(" ", start, pos)
+    return 0
+
+
+def _outside_escapes(content: str, escapes: EscapeMap, pos: int) -> bool:
+    if escapes.find(pos) >= 0:
+        return False
+    # A named escape that isn't closed in the content could extend past pos
+    i = content.rfind("\\N{", 0, pos)
+    return i < 0 or content.find("}", i, pos) >= 0
+
+
+class _Writer:
+    """Turn the sentences into lines and write them"""
+
+    def __init__(
+        self, outfile: IO[str], indent: str, quote: str, is_fstring: bool
+    ) -> None:
+        self.outfile = outfile
+        self.indent = indent
+        self.quote = quote
+        self.is_fstring = is_fstring
+        self.count = 0
+        self.fed = False
+        # Whether a piece had spaces in escape sequences
+        self._masked = False
+        # The last line is held back for the trailing comma
+        self._pending: Optional[str] = None
+
+    def feed(self, breaker: GreedyBreaker, prefix: str, piece: str) -> None:
+        literal = prefix + self.quote + piece + self.quote
+        source, table = translate_source(literal)
+        self._masked = self._masked or bool(table.masked)
+        self.fed = True
+        for sentence, kind in breaker.feed(tokenize(source, table)):
+            self.write(sentence, kind)
+
+    def write(self, sentence: str, kind: int) -> None:
+        if self._masked and PLACEHOLDER in sentence:
+            sentence = sentence.replace(PLACEHOLDER, " ")
+        if kind == Kind.FORMAT:
+            line = f"{self.indent}f{self.quote}{sentence}{self.quote}"
+        else:
+            if self.is_fstring:
+                sentence = unescape_braces(sentence)
+            line = f"{self.indent}{self.quote}{sentence}{self.quote}"
+        if self._pending is not None:
+            self.outfile.write(self._pending + "\n")
+            self.count += 1
+        self._pending = line
+
+    def close(self, trailing_comma: bool) -> None:
+        if self._pending is None:
+            return
+        comma = "," if trailing_comma else ""
+        self.outfile.write(self._pending + comma + "\n")
+        self.count += 1
+        self._pending = None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m string_wrap.stream",
+        description="Wrap the string literal on a single line",
+    )
+    parser.add_argument(
+        "-w",
+        "--width",
+        type=int,
+        default=79,
+        help="Maximum line width (default: %(default)s)",
+    )
+    parser.add_argument(
+        "input", nargs="?", default="-", help="Input file (default: stdin)"
+    )
+    parser.add_argument(
+        "output", nargs="?", default="-", help="Output file (default: stdout)"
+    )
+    args = parser.parse_args(argv)
+
+    infile: Union[IO[bytes], IO[str]]
+    infile = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    if args.output == "-":
+        sys.stdout.reconfigure(encoding="utf-8")
+        outfile = sys.stdout
+    else:
+        outfile = open(args.output, "w", encoding="utf-8")
+    try:
+        wrap_stream(infile, outfile, args.width)
+    finally:
+        if infile is not sys.stdin.buffer:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+
+
+if __name__ == "__main__":
+    main()
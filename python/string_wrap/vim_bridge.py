@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+
+"""
+Functions that are called from the Vim plugin.
+
+The plugin imports this module once per Vim session and calls these functions
+with py3eval, passing the values it needs from Vim as arguments. Line numbers
+are 1-based, as in Vim.
+
+Large inputs can be wrapped in the background with submit, which returns a
+job id right away. The plugin then polls the job from a timer and applies the
+result itself. The background thread never touches the vim module, which is
+not thread-safe.
+
+License: See LICENSE file
+
+"""
+
+from __future__ import annotations
+
+import itertools
+import sys
+import threading
+
+from . import stats
+from . import wrapper
+from .lexer import TokenizeError
+
+try:
+    import vim
+except ImportError:
+    # Not running inside Vim
+    vim = None
+
+# The batch module and the thread pool are imported when they are needed, to
+# keep the startup of the plugin fast
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+    from concurrent.futures import ThreadPoolExecutor
+    from typing import Any
+    from typing import Callable
+    from typing import Dict
+    from typing import List
+    from typing import Optional
+    from typing import Tuple
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+_JOBS: Dict[int, Future] = {}
+_JOB_IDS = itertools.count(1)
+
+# The errors of strings that can't be wrapped, e.g., an f-string with an
+# invalid replacement field
+_WRAP_ERRORS = (ValueError, TokenizeError, SyntaxError)
+
+
+def _report(err: Exception) -> None:
+    print(f"[StringWrap] ERROR: {err}", file=sys.stderr)
+
+
+def engines() -> List[str]:
+    return list(wrapper.ENGINES)
+
+
+def wrap_line(lnum: int, text_width: int, engine: str) -> bool:
+    """Wrap the string on the given line of the current buffer"""
+    buf = vim.current.buffer
+    try:
+        line = _read_lines(buf, lnum, lnum)[0]
+        lines = wrapper.string_wrap(line, text_width, engine)
+    except _WRAP_ERRORS as err:
+        _report(err)
+        return False
+    return _replace_lines(buf, lnum, lnum, lines)
+
+
+def unwrap_lines(start: int, end: int) -> bool:
+    """Unwrap the string on lines start to end of the current buffer"""
+    buf = vim.current.buffer
+    try:
+        lines = wrapper.string_unwrap(_read_lines(buf, start, end))
+    except _WRAP_ERRORS as err:
+        _report(err)
+        return False
+    return _replace_lines(buf, start, end, lines)
+
+
+def rewrap_lines(start: int, end: int, text_width: int, engine: str) -> bool:
+    """Rewrap the string on lines start to end of the current buffer"""
+    buf = vim.current.buffer
+    try:
+        old = _read_lines(buf, start, end)
+        lines = wrapper.string_rewrap(old, text_width, engine)
+    except _WRAP_ERRORS as err:
+        _report(err)
+        return False
+    return _replace_lines(buf, start, end, lines)
+
+
+def wrap_all(text_width: int, engine: str) -> int:
+    """Wrap all over-long string lines of the current buffer
+
+    The whole buffer is scanned and wrapped in one call. The changes are
+    applied from the bottom up, so that the line numbers of the changes that
+    remain are not affected. Returns the number of strings that were wrapped.
+    """
+    from . import batch
+
+    buf = vim.current.buffer
+    try:
+        changes = batch.find_changes(
+            _read_lines(buf, 1, len(buf)), text_width, engine
+        )
+    except ValueError as err:
+        _report(err)
+        return 0
+    for idx, lines in reversed(changes):
+        _replace_lines(buf, idx + 1, idx + 1, lines)
+    return len(changes)
+
+
+def enable_stats(enabled: bool) -> None:
+    stats.enable(bool(enabled))
+
+
+def reset_stats() -> None:
+    stats.reset()
+
+
+def stats_summary() -> Dict[str, List[float]]:
+    """Return count, total, p50 and p99 (in seconds) for every stage"""
+    return {stage: list(s) for stage, s in stats.summary().items()}
+
+
+@stats.timed("buffer_read")
+def _read_lines(buf: "vim.Buffer", start: int, end: int) -> List[str]:
+    return buf[start - 1 : end]
+
+
+@stats.timed("buffer_write")
+def _replace_lines(
+    buf: "vim.Buffer", start: int, end: int, lines: Optional[List[str]]
+) -> bool:
+    """Replace lines start to end with the given lines
+
+    Only the lines that differ are written, with a single slice assignment,
+    so that unchanged lines keep their marks and aren't redrawn.
+    """
+    if lines is None:
+        return False
+    first = start - 1
+    old = buf[first:end]
+    lo, old_hi, new_hi = changed_range(old, lines)
+    if lo < old_hi or lo < new_hi:
+        buf[first + lo : first + old_hi] = lines[lo:new_hi]
+    return True
+
+
+def changed_range(old: List[str], new: List[str]) -> Tuple[int, int, int]:
+    """Find the smallest range of lines that differs between old and new
+
+    Returns (lo, old_hi, new_hi) such that replacing old[lo:old_hi] with
+    new[lo:new_hi] turns old into new.
+    """
+    limit = min(len(old), len(new))
+    lo = 0
+    while lo < limit and old[lo] == new[lo]:
+        lo += 1
+    limit -= lo
+    suffix = 0
+    while suffix < limit and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return lo, len(old) - suffix, len(new) - suffix
+
+
+def _first(results: List[wrapper.WrapResult]) -> List[str]:
+    result = results[0]
+    if result.lines is None:
+        raise ValueError(result.error)
+    return result.lines
+
+
+def _wrap_async(line: str, text_width: int, engine: str) -> List[str]:
+    return _first(wrapper.wrap_many([line], text_width, engine))
+
+
+def _unwrap_async(lines: List[str]) -> List[str]:
+    return _first(wrapper.unwrap_many([lines]))
+
+
+def _rewrap_async(lines: List[str], text_width: int, engine: str) -> List[str]:
+    return _first(wrapper.rewrap_many([lines], text_width, engine))
+
+
+def _wrap_all_async(
+    lines: List[str], text_width: int, engine: str
+) -> List[List[Any]]:
+    from . import batch
+
+    changes = batch.find_changes(lines, text_width, engine)
+    return [[idx, wrapped] for idx, wrapped in changes]
+
+
+_ASYNC_METHODS: Dict[str, Callable[..., Any]] = {
+    "wrap": _wrap_async,
+    "unwrap": _unwrap_async,
+    "rewrap": _rewrap_async,
+    "wrap_all": _wrap_all_async,
+}
+
+
+def submit(method: str, **params) -> int:
+    """Start a wrap, unwrap, rewrap or wrap_all job in the background
+
+    The parameters are those of the server methods with the same name, so
+    they hold the lines and not line numbers, and the result is applied by
+    the caller. Returns the job id to pass to poll.
+    """
+    global _EXECUTOR
+
+    func = _ASYNC_METHODS[method]
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="string_wrap"
+            )
+        job_id = next(_JOB_IDS)
+        _JOBS[job_id] = _EXECUTOR.submit(func, **params)
+    return job_id
+
+
+def poll(job_id: int) -> Optional[Dict[str, Any]]:
+    """Get the result of a job, or None if it is still running
+
+    The result is a dict with either a "result" or an "error" key. A job can
+    only be collected once.
+    """
+    future = _JOBS.get(job_id)
+    if future is None:
+        return {"error": f"Unknown job: {job_id}"}
+    if not future.done():
+        return None
+    del _JOBS[job_id]
+    try:
+        return {"result": future.result()}
+    except ValueError as err:
+        return {"error": str(err)}
+    except Exception as err:
+        return {"error": f"Internal error: {err!r}"}
+
+
+def cancel(job_id: int) -> bool:
+    """Forget a job, returns whether it was stopped before it started"""
+    future = _JOBS.pop(job_id, None)
+    return future is not None and future.cancel()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+"""
+Display width of text, as the number of columns it takes in the editor.
+
+Most characters take one column. East Asian wide and fullwidth characters
+(CJK ideographs, kana, Hangul syllables, most emoji) take two, and combining
+marks and other invisible format characters take none. ASCII text is measured
+with len. Other characters are looked up in the ranges of the precomputed
+table in _width_table with a binary search, and the widths of the characters
+that were seen are kept in a dictionary.
+
+The table is generated from the unicodedata module, regenerate it with:
+
+    PYTHONPATH=./python/ python -m string_wrap.width
+
+License: See LICENSE file
+
+"""
+
+from __future__ import annotations
+
+import os
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import List
+    from typing import Tuple
+
+TABLE_PATH = os.path.join(os.path.dirname(__file__), "_width_table.py")
+
+# Blocks where the unassigned code points are wide, following UAX #11
+_WIDE_BLOCKS = (
+    (0x3400, 0x4DBF),
+    (0x4E00, 0x9FFF),
+    (0xF900, 0xFAFF),
+    (0x20000, 0x2FFFD),
+    (0x30000, 0x3FFFD),
+)
+
+
+class _WidthCache(dict):
+    """The display widths of the characters, looked up on first use"""
+
+    def __missing__(self, char: str) -> int:
+        # The table is imported here as only non-ASCII text needs it
+        from bisect import bisect_right
+
+        from ._width_table import STARTS
+        from ._width_table import WIDTHS
+
+        code = ord(char)
+        width = 1 if code < 0x80 else WIDTHS[bisect_right(STARTS, code) - 1]
+        self[char] = width
+        return width
+
+
+_WIDTHS = _WidthCache()
+
+
+def char_width(char: str) -> int:
+    """Return the number of columns of a single character"""
+    return _WIDTHS[char]
+
+
+def display_width(text: str) -> int:
+    """Return the number of columns of the text"""
+    if text.isascii():
+        return len(text)
+    return sum(map(_WIDTHS.__getitem__, text))
+
+
+def is_narrow(text: str) -> bool:
+    """Whether every character of the text takes one column"""
+    if text.isascii():
+        return True
+    widths = _WIDTHS
+    return all(widths[char] == 1 for char in set(text))
+
+
+def unicode_width(code: int) -> int:
+    """Compute the display width of a code point from the unicodedata"""
+    import unicodedata
+
+    char = chr(code)
+    category = unicodedata.category(char)
+    if category == "Cn":
+        wide = any(lo <= code <= hi for lo, hi in _WIDE_BLOCKS)
+        return 2 if wide else 1
+    if code == 0xAD:
+        # The soft hyphen is shown by most terminals
+        return 1
+    if category in ("Mn", "Me", "Cf") or 0x1160 <= code <= 0x11FF:
+        # Combining marks, format characters and the Hangul vowels and final
+        # consonants that join with the preceding syllable
+        return 0
+    if unicodedata.east_asian_width(char) in ("W", "F"):
+        return 2
+    return 1
+
+
+def make_table() -> Tuple[List[int], bytes]:
+    """Compute the ranges of non-ASCII code points that have the same width"""
+    starts = []
+    widths = bytearray()
+    for code in range(0x80, 0x110000):
+        width = unicode_width(code)
+        if not widths or widths[-1] != width:
+            starts.append(code)
+            widths.append(width)
+    return starts, bytes(widths)
+
+
+def write_table(path: str) -> None:
+    import textwrap
+    import unicodedata
+
+    starts, widths = make_table()
+    hexes = " ".join(f"0x{start:X}," for start in starts)
+    # Each width as a \xNN escape, in pieces that fit on a line
+    escaped = "".join(f"\\x{width:02x}" for width in widths)
+    pieces = [escaped[i : i + 64] for i in range(0, len(escaped), 64)]
+    with open(path, "w", encoding="utf-8") as fp:
+        fp.write(
+            "# -*- coding: utf-8 -*-\n\n"
+            '"""\n'
+            "Display widths of the non-ASCII characters, generated by "
+            "width.py.\n\n"
+            "Do not edit, see width.py for how to regenerate this file.\n\n"
+            "License: See LICENSE file\n\n"
+            '"""\n\n'
+            "# Version of the Unicode database that the table is made from\n"
+            f'UNICODE_VERSION = "{unicodedata.unidata_version}"\n\n'
+            "# The code points from STARTS[i] up to STARTS[i + 1] have "
+            "display width\n"
+            "# WIDTHS[i]\n"
+            "STARTS = (\n"
+        )
+        for line in textwrap.wrap(hexes, 75):
+            fp.write(f"    {line}\n")
+        fp.write(")\n\nWIDTHS = (\n")
+        for piece in pieces:
+            fp.write(f'    b"{piece}"\n')
+        fp.write(")\n")
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Generate the table of display widths"
+    )
+    parser.add_argument("output", nargs="?", default=TABLE_PATH)
+    args = parser.parse_args()
+    write_table(args.output)
+
+
+if __name__ == "__main__":
+    main()
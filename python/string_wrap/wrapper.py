@@ -10,265 +10,966 @@ License: See LICENSE file
 
 """
 
-import ast
+from __future__ import annotations
+
 import sys
+import threading
+
+from collections import OrderedDict
+from operator import itemgetter
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from array import array
+    from typing import Callable
+    from typing import Hashable
+    from typing import Iterator
+    from typing import List
+    from typing import Optional
+    from typing import Sequence
+    from typing import Tuple
+    from typing import Union
+
+from .lexer import FIELD
+from .lexer import PLACEHOLDER
+from .lexer import EscapeMap
+from .lexer import TokenizeError
+from .lexer import escape_braces
+from .lexer import iter_parts
+from .lexer import split_literal
+from .lexer import unescape_braces
+from .stats import timed
+from .width import is_narrow
+
+# Version of the wrapping engine. This must be increased whenever a change
+# alters the output for some input, as it invalidates stored results.
+ENGINE_VERSION = 4
+
+# Default line breaking engine, see ENGINES for the available engines
+DEFAULT_ENGINE = "greedy"
+
+# Default number of results kept in the in-process result cache
+DEFAULT_CACHE_SIZE = 128
+
+# Number of tokens from which the greedy engine uses NumPy, if it's installed.
+# Importing NumPy takes longer than breaking smaller strings.
+NUMPY_MIN_TOKENS = 20_000
+
+# The NumPy version of break_tokens, None if NumPy isn't installed, or False
+# if that isn't known yet
+_NUMPY_BREAK_TOKENS: Union[Callable, None, bool] = False
 
-from dataclasses import dataclass
-from enum import Enum
 
-from typing import Dict
-from typing import List
-from typing import Optional
-from typing import Tuple
+class UnsupportASTLiteralError(ValueError):
+    pass
 
-if sys.version_info >= (3, 9):
-    from ast import unparse as ast_unparse
-else:
-    from .ast_backports import unparse as ast_unparse
 
+class InputError(ValueError):
+    """The input is not a string literal on its own line(s)"""
+
+
+class Kind:
+    """The kinds of tokens and sentences, plain ints for speed"""
+
+    REGULAR = 0
+    FORMAT = 1
 
-class UnsupportASTLiteralError(ValueError):
-    pass
 
+class Token:
+    __slots__ = ("kind", "value", "trailing_space")
 
-class TokenizeError(Exception):
-    def __init__(self, source: str, reason: str) -> None:
-        self._source = source
-        self._reason = reason
+    def __init__(self, kind: int, value: str, trailing_space: bool) -> None:
+        self.kind = kind
+        self.value = value
+        self.trailing_space = trailing_space
 
     def __repr__(self) -> str:
         return (
-            f"TokenizeError(source={self._source!r}, reason={self._reason!r})"
+            f"Token(kind={self.kind}, value={self.value!r}, "
+            f"trailing_space={self.trailing_space})"
         )
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Token):
+            return NotImplemented
+        return (self.kind, self.value, self.trailing_space) == (
+            other.kind,
+            other.value,
+            other.trailing_space,
+        )
 
-class Kind(Enum):
-    REGULAR = 0
-    FORMAT = 1
 
+# Flags of the tokens in a TokenList, the kind is the lowest bit
+TRAILING_SPACE = 2
 
-@dataclass
-class Token:
-    kind: Kind
-    value: str
-    trailing_space: bool
+
+class TokenList:
+    """The tokens of a string as offsets into one text
+
+    The text is the concatenation of the tokens with their trailing spaces,
+    so token i is ``text[starts[i]:ends[i]]`` and a sentence of consecutive
+    tokens is a single slice of the text. The kind and the trailing space of
+    each token are stored as bits of its flags. Widths are display widths,
+    see columns().
+
+    This takes nine bytes per token instead of a Token object and a string
+    for each word. Indexing and iterating create Token objects on the fly.
+    """
+
+    __slots__ = ("text", "starts", "ends", "flags")
+
+    def __init__(self, text: str = "") -> None:
+        # Imported here as it adds to the startup time of the plugin
+        from array import array
+
+        self.text = text
+        self.starts = array("I")
+        self.ends = array("I")
+        self.flags = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+    def __getitem__(self, i: int) -> Token:
+        flag = self.flags[i]
+        return Token(
+            flag & Kind.FORMAT,
+            self.text[self.starts[i] : self.ends[i]],
+            trailing_space=bool(flag & TRAILING_SPACE),
+        )
+
+    def __iter__(self) -> Iterator[Token]:
+        for i in range(len(self.flags)):
+            yield self[i]
+
+    def __repr__(self) -> str:
+        return f"TokenList({list(self)!r})"
+
+    def columns(self) -> array:
+        """Return the display column at which each token starts
+
+        The array has one more item, the width of the whole text, so the width
+        of token i with its trailing space is ``columns[i + 1] - columns[i]``.
+        For ASCII text these are the offsets of the tokens.
+        """
+        text = self.text
+        columns = self.starts[:]
+        columns.append(len(text))
+        if text.isascii():
+            return columns
+
+        # Only text with wide or zero-width characters needs the table
+        from array import array
+        from itertools import accumulate
+
+        from .width import display_width
+
+        pieces = map(text.__getitem__, map(slice, columns, columns[1:]))
+        return array("I", accumulate(map(display_width, pieces), initial=0))
+
+
+class _TokenListBuilder:
+    """Collect the text and the tokens of a TokenList"""
+
+    def __init__(self) -> None:
+        self.tokens = TokenList()
+        self.pieces: List[str] = []
+        self.length = 0
+
+    def add_field(self, value: str) -> None:
+        tokens = self.tokens
+        tokens.starts.append(self.length)
+        self.length += len(value)
+        tokens.ends.append(self.length)
+        tokens.flags.append(Kind.FORMAT)
+        self.pieces.append(value)
+
+    def add_words(self, text: str) -> None:
+        """Split literal text into words and add these as tokens"""
+        if not text:
+            return
+        flags = self.tokens.flags
+        if text[0] == " " and flags and flags[-1] & Kind.FORMAT:
+            # Attach space to last format token if possible, to avoid moving
+            # the space to the next sentence. A run of spaces becomes a
+            # single one, but the last space of text that is only spaces
+            # stays a word of its own.
+            stripped = text.lstrip(" ")
+            skip = len(text) - len(stripped) if stripped else len(text) - 1
+            if skip:
+                flags[-1] |= TRAILING_SPACE
+                self.pieces.append(" ")
+                self.length += 1
+                text = text[skip:]
+
+        starts = self.tokens.starts
+        ends = self.tokens.ends
+        base = self.length
+        find = text.find
+        pos = 0
+        end = find(" ")
+        while end >= 0:
+            starts.append(base + pos)
+            ends.append(base + end)
+            flags.append(TRAILING_SPACE)
+            pos = end + 1
+            end = find(" ", pos)
+        if pos < len(text):
+            starts.append(base + pos)
+            ends.append(base + len(text))
+            flags.append(Kind.REGULAR)
+        self.pieces.append(text)
+        self.length += len(text)
+
+    def finish(self) -> TokenList:
+        tokens = self.tokens
+        tokens.text = "".join(self.pieces)
+        if not tokens.flags:
+            tokens.starts.append(0)
+            tokens.ends.append(0)
+            tokens.flags.append(Kind.REGULAR)
+        return tokens
+
+
+# The result types below are tuple subclasses written out by hand, as creating
+# them with namedtuple takes a large part of the import time.
+
+
+class CacheInfo(tuple):
+    __slots__ = ()
+
+    def __new__(
+        cls, hits: int, misses: int, maxsize: int, currsize: int
+    ) -> CacheInfo:
+        return tuple.__new__(cls, (hits, misses, maxsize, currsize))
+
+    hits = property(itemgetter(0))
+    misses = property(itemgetter(1))
+    maxsize = property(itemgetter(2))
+    currsize = property(itemgetter(3))
+
+
+class MemoCache:
+    """Bounded LRU cache of the results of the wrapping functions
+
+    Only successful results are stored, and copies are returned so that
+    callers can't modify the cached values.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[str, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[List[str]]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._data.move_to_end(key)
+            return list(value)
+
+    def put(self, key: Hashable, value: List[str]) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = tuple(value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def resize(self, maxsize: int) -> None:
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > max(maxsize, 0):
+                self._data.popitem(last=False)
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+
+_RESULT_CACHE = MemoCache()
+
+
+def cache_info() -> CacheInfo:
+    """Return the hit and miss statistics of the result cache"""
+    return _RESULT_CACHE.info()
+
+
+def cache_clear() -> None:
+    """Empty the result cache and reset its statistics"""
+    _RESULT_CACHE.clear()
+
+
+def set_cache_size(maxsize: int) -> None:
+    """Set the number of results to keep in the cache (0 disables it)"""
+    _RESULT_CACHE.resize(maxsize)
 
 
-@dataclass
 class InputInfo:
-    lines: List[str]
-    start_pos: int
-    quote_str: str
-    is_fstring: bool
-    trailing_comma: bool
-    indent_len: int
-
-
-def tokenize(source: str) -> List[Token]:
-    """Tokenize the source string into Tokens that we can recombine"""
-    module = ast.parse(source)
-    body = module.body
-    if len(body) > 1:
-        raise TokenizeError(source, "no body")
-
-    expr = body[0]
-    if not hasattr(expr, "value"):
-        raise TokenizeError(source, "no value")
-    value = expr.value
-    if isinstance(value, ast.JoinedStr):
-        string_parts = value.values
-    elif isinstance(value, ast.Constant):
-        string_parts = [value]
-    else:
-        raise TokenizeError(source, "unsupported expression value")
-
-    tokens = []
-    for part in string_parts:
-        if isinstance(part, ast.Constant):
-            words = part.value.split(" ")
-            if not words[-1]:
-                words = words[:-1]
-                last_trailing = True
-            else:
-                last_trailing = False
-
-            for word in words[:-1]:
-                # Attach space to last format token if possible, to avoid
-                # moving the space to the next sentence
-                if not word and tokens[-1].kind is Kind.FORMAT:
-                    tokens[-1].trailing_space = True
-                    continue
-                token = Token(Kind.REGULAR, word, trailing_space=True)
-                tokens.append(token)
-
-            tokens.append(
-                Token(Kind.REGULAR, words[-1], trailing_space=last_trailing)
-            )
-        else:
-            tokens.append(
-                Token(Kind.FORMAT, ast_unparse(part), trailing_space=False)
-            )
-    return tokens
+    __slots__ = (
+        "lines",
+        "start_pos",
+        "quote_str",
+        "is_fstring",
+        "trailing_comma",
+        "indent_len",
+    )
+
+    def __init__(
+        self,
+        lines: List[str],
+        start_pos: int,
+        quote_str: str,
+        is_fstring: bool,
+        trailing_comma: bool,
+        indent_len: int,
+    ) -> None:
+        self.lines = lines
+        self.start_pos = start_pos
+        self.quote_str = quote_str
+        self.is_fstring = is_fstring
+        self.trailing_comma = trailing_comma
+        self.indent_len = indent_len
+
+
+def tokenize(
+    source: str, escapes: Optional[EscapeMap] = None
+) -> TokenList:
+    """Tokenize the source string into Tokens that we can recombine
+
+    The text of the tokens is the source text, so escape sequences, doubled
+    braces and replacement fields are kept as they are. The map of escape
+    sequences can be given if it is already known.
+    """
+    is_fstring, quote, content = split_literal(source)
+    return tokenize_content(content, quote, is_fstring, escapes)
+
+
+@timed("tokenize")
+def tokenize_content(
+    content: str,
+    quote: str,
+    is_fstring: bool,
+    escapes: Optional[EscapeMap] = None,
+) -> TokenList:
+    """Tokenize the content of a literal, without the prefix and quotes"""
+    builder = _TokenListBuilder()
+    # Literal text that hasn't been split into words yet
+    pending: List[str] = []
+    # Fields that are known to be valid
+    checked = set()
+    for kind, start, end in iter_parts(content, quote, is_fstring, escapes):
+        if kind != FIELD:
+            pending.append(content[start:end])
+            continue
+        field = content[start:end]
+        if field not in checked:
+            check_field(field, quote)
+            checked.add(field)
+        builder.add_words("".join(pending))
+        pending.clear()
+        builder.add_field(field)
+    builder.add_words("".join(pending))
+    return builder.finish()
+
+
+@timed("ast")
+def check_field(field: str, quote: str) -> None:
+    """Check that a replacement field is valid Python
+
+    The field is kept as the user wrote it, the syntax tree is only used to
+    check it. Raises SyntaxError or TokenizeError if the field is invalid.
+    """
+    # Only f-strings with fields need the ast module
+    import ast
+
+    expr = ast.parse("f" + quote + field + quote, mode="eval").body
+    if not isinstance(expr, ast.JoinedStr):
+        raise TokenizeError(field, "unsupported expression value")
+
+
+def make_sentences(
+    source: str,
+    width: int,
+    engine: str = DEFAULT_ENGINE,
+    escapes: Optional[EscapeMap] = None,
+) -> Tuple[List[str], List[int]]:
+    breaker = get_engine(engine)
+    if breaker is break_tokens and _is_simple(source):
+        sentences = _break_simple(source[1:-1], width)
+        return sentences, [Kind.REGULAR] * len(sentences)
+    return _break_all(breaker, tokenize(source, escapes), width)
+
+
+def _is_simple(source: str) -> bool:
+    """Whether the words of the literal are the text between the spaces
 
+    This holds for a literal that isn't an f-string and doesn't have escape
+    sequences (or quotes, which are invalid without them). The characters
+    must also be narrow, so that the width of the words is their length.
+    """
+    return (
+        len(source) >= 2
+        and source[0] in "'\""
+        and source[-1] == source[0]
+        and "\\" not in source
+        and source.count(source[0]) == 2
+        and is_narrow(source)
+    )
 
-def make_sentences(source: str, width: int) -> Tuple[List[str], List[Kind]]:
-    tokens = tokenize(source)
 
+def _is_plain(content: str, quote: str) -> bool:
+    """Whether the content of a literal is simple, see _is_simple"""
+    return "\\" not in content and quote not in content and is_narrow(content)
+
+
+@timed("break")
+def _break_simple(content: str, width: int) -> List[str]:
+    """Greedy line breaking for content where the words are separated by
+    spaces only, see _iter_simple"""
+    return list(_iter_simple(content, width))
+
+
+def _iter_simple(content: str, width: int) -> Iterator[str]:
+    """Generate the sentences of content where the words are separated by
+    spaces only
+
+    Instead of adding words one by one, this jumps ahead by the width and
+    looks for the last space before that point, so the work is done per
+    sentence and in string searches. The sentences are the same as those of
+    break_tokens on the tokens of the content.
+    """
+    n = len(content)
+    rfind = content.rfind
+    # Width that a sentence can have before its last space
+    reach = max(width, 0)
+    pos = 0
+    while n - pos > width:
+        # A sentence ends with a space, and its width includes that space
+        end = rfind(" ", pos, pos + reach)
+        if end < 0:
+            # The first word doesn't fit, so it gets a sentence of its own
+            # (after an empty one if it's the first word)
+            if pos == 0:
+                yield ""
+            end = content.find(" ", pos)
+            if end < 0:
+                break
+        yield content[pos : end + 1]
+        pos = end + 1
+        if pos == n:
+            return
+    yield content[pos:]
+
+
+@timed("break")
+def _break_all(
+    breaker: Callable[[TokenList, int], Iterator[Tuple[str, int]]],
+    tokens: TokenList,
+    width: int,
+) -> Tuple[List[str], List[int]]:
     sentences = []
     sentence_kinds = []
-    sentence = ""
-    sentence_kind = Kind.REGULAR
-
-    for token in tokens:
-        # Maximum width is reduced by one if the sentence is or could become an
-        # f-string.
-        max_width = (
-            width - 1
-            if (token.kind is Kind.FORMAT or sentence_kind is Kind.FORMAT)
-            else width
+    for sentence, sentence_kind in breaker(tokens, width):
+        sentences.append(sentence)
+        sentence_kinds.append(sentence_kind)
+    return sentences, sentence_kinds
+
+
+def iter_sentences(
+    source: str,
+    width: int,
+    engine: str = DEFAULT_ENGINE,
+    escapes: Optional[EscapeMap] = None,
+) -> Iterator[Tuple[str, int]]:
+    """Generate the wrapped sentences of the source with their kind"""
+    breaker = get_engine(engine)
+    if breaker is break_tokens and _is_simple(source):
+        # The same fast path as make_sentences
+        return (
+            (sentence, Kind.REGULAR)
+            for sentence in _iter_simple(source[1:-1], width)
         )
-        combined_token = token.value + " " * token.trailing_space
-        combined_width = len(combined_token)
+    return breaker(tokenize(source, escapes), width)
 
-        # If we'll overflow, create a new sentence
-        if len(sentence) + combined_width > max_width:
-            sentences.append(sentence)
-            sentence_kinds.append(sentence_kind)
 
-            sentence = ""
-            sentence_kind = Kind.REGULAR
+def get_engine(
+    engine: str,
+) -> Callable[[TokenList, int], Iterator[Tuple[str, int]]]:
+    try:
+        return ENGINES[engine]
+    except KeyError:
+        raise ValueError(
+            f"Unknown wrapping engine {engine!r}, "
+            f"choose from: {', '.join(ENGINES)}"
+        ) from None
 
-        sentence += combined_token
-        sentence_kind = (
-            Kind.FORMAT if token.kind is Kind.FORMAT else sentence_kind
-        )
 
-    # Don't forget to store the last sentence info
-    if sentence:
-        sentences.append(sentence)
-        sentence_kinds.append(sentence_kind)
+class GreedyBreaker:
+    """Greedy line breaking of tokens that are fed in one or more parts
 
-    return sentences, sentence_kinds
+    The sentence that is still open at the end of a part is continued with the
+    tokens of the next part, so feeding the parts of a token stream one by one
+    gives the same sentences as feeding all tokens at once.
+    """
+
+    __slots__ = ("width", "_carry", "_length", "_kind")
+
+    def __init__(self, width: int) -> None:
+        self.width = width
+        # Text, width and kind of the open sentence
+        self._carry = ""
+        self._length = 0
+        self._kind = Kind.REGULAR
+
+    def feed(self, tokens: TokenList) -> Iterator[Tuple[str, int]]:
+        """Yield the sentences that the tokens complete"""
+        text = tokens.text
+        width = self.width
+        carry = self._carry
+        length = self._length
+        sentence_kind = self._kind
+        # Offset in the text where the open sentence starts
+        first = 0
+
+        columns = tokens.columns()
+        for start, column, next_column, flag in zip(
+            tokens.starts, columns, columns[1:], tokens.flags
+        ):
+            is_format = flag & Kind.FORMAT
+            # Maximum width is reduced by one if the sentence is or could
+            # become an f-string.
+            max_width = (
+                width - 1
+                if (is_format or sentence_kind == Kind.FORMAT)
+                else width
+            )
+            token_width = next_column - column
+
+            # If we'll overflow, create a new sentence
+            if length + token_width > max_width:
+                yield carry + text[first:start], sentence_kind
+                carry = ""
+                first = start
+                length = 0
+                sentence_kind = Kind.REGULAR
+
+            length += token_width
+            if is_format:
+                sentence_kind = Kind.FORMAT
+
+        self._carry = carry + text[first:]
+        self._length = length
+        self._kind = sentence_kind
+
+    def finish(self) -> Tuple[str, int]:
+        """Return the last sentence, which may be empty"""
+        return self._carry, self._kind
+
+
+def _numpy_break_tokens() -> Optional[
+    Callable[[TokenList, int], Iterator[Tuple[str, int]]]
+]:
+    """Return the NumPy version of break_tokens, or None without NumPy"""
+    global _NUMPY_BREAK_TOKENS
+    if _NUMPY_BREAK_TOKENS is False:
+        try:
+            from .greedy_numpy import break_tokens as numpy_break_tokens
+        except ImportError:
+            _NUMPY_BREAK_TOKENS = None
+        else:
+            _NUMPY_BREAK_TOKENS = numpy_break_tokens
+    return _NUMPY_BREAK_TOKENS
+
+
+def break_tokens(tokens: TokenList, width: int) -> Iterator[Tuple[str, int]]:
+    """Greedily combine tokens into sentences of at most the given width
+
+    Sentences are yielded as soon as they are complete. The text of each
+    sentence is sliced from the text of the tokens. If NumPy is installed,
+    the breaks of strings with many tokens are computed with it instead.
+    """
+    if len(tokens) >= NUMPY_MIN_TOKENS:
+        numpy_break_tokens = _numpy_break_tokens()
+        if numpy_break_tokens is not None:
+            yield from numpy_break_tokens(tokens, width)
+            return
+
+    breaker = GreedyBreaker(width)
+    yield from breaker.feed(tokens)
+    # Don't forget to yield the last sentence, an empty string still results
+    # in one (empty) sentence
+    yield breaker.finish()
+
+
+def break_tokens_optimal(
+    tokens: TokenList, width: int
+) -> Iterator[Tuple[str, int]]:
+    """Combine tokens into sentences such that the raggedness is minimal
+
+    The raggedness is the sum over all sentences (including the last one) of
+    the squared number of unused characters. This avoids the short last
+    sentence that greedy wrapping often produces. The same width rules apply
+    as for greedy wrapping, and a token that is too long always gets a
+    sentence of its own.
+
+    This is a dynamic program over the tokens, where only the tokens that fit
+    on the same line are considered as the start of the sentence that ends at
+    a given token. The running time is therefore linear in the number of
+    tokens for a given width.
+    """
+    n = len(tokens)
+    text = tokens.text
+    # The tokens are consecutive in the text, so the prefix sums of the widths
+    # are the columns of the tokens
+    columns = tokens.columns().tolist()
+    starts = tokens.starts.tolist()
+    starts.append(len(text))
+    # Prefix sums of the number of format tokens
+    formats = [0] * (n + 1)
+    for j, flag in enumerate(tokens.flags):
+        formats[j + 1] = formats[j] + (flag & Kind.FORMAT)
+
+    # cost[j] is the minimal raggedness of the sentences for tokens[:j], and
+    # start[j] the index of the first token of the last of these sentences.
+    cost = [0] * (n + 1)
+    start = [0] * (n + 1)
+    for j in range(1, n + 1):
+        best = -1
+        best_i = j - 1
+        i = j - 1
+        while i >= 0:
+            length = columns[j] - columns[i]
+            limit = width - 1 if formats[j] != formats[i] else width
+            if length > limit:
+                if i == j - 1:
+                    # The token doesn't fit on a line on its own
+                    best = cost[i]
+                break
+            c = cost[i] + (limit - length) ** 2
+            if best < 0 or c <= best:
+                best = c
+                best_i = i
+            i -= 1
+        cost[j] = best
+        start[j] = best_i
+
+    bounds = []
+    j = n
+    while j > 0:
+        bounds.append((start[j], j))
+        j = start[j]
+    if not bounds:
+        yield "", Kind.REGULAR
+        return
+
+    for i, j in reversed(bounds):
+        kind = Kind.FORMAT if formats[j] != formats[i] else Kind.REGULAR
+        yield text[starts[i] : starts[j]], kind
+
+
+ENGINES = {
+    "greedy": break_tokens,
+    "optimal": break_tokens_optimal,
+}
 
 
 def wrap_text(
-    source: str, width: int, table: Dict[int, str]
+    source: str,
+    width: int,
+    table: EscapeMap,
+    engine: str = DEFAULT_ENGINE,
 ) -> Tuple[List[str], List[int]]:
     """Wrap text to multiple lines with specified maximum width
 
     This function wraps text in such a way that sentences always end with a
     space, which I prefer to the alternative of sentences occassionally
     starting with a space (which would happen when using textwrap.wrap).
+
+    The engine determines how the lines are broken, see ENGINES.
     """
     # Source should be everything including the 'f' part and the quotes. It
     # should be one line.
-    sentences, sentence_kinds = make_sentences(source, width)
+    sentences, sentence_kinds = make_sentences(source, width, engine, table)
 
     clean_sentences = untranslate_source(sentences, table)
 
-    f_indices = [i for i, k in enumerate(sentence_kinds) if k is Kind.FORMAT]
-
-    return clean_sentences, f_indices
-
-
-def translate_source(source: str) -> Tuple[str, Dict[int, str]]:
-    new_source = []
-    translations = {
-        "\a": "AA",
-        "\b": "BB",
-        "\f": "FF",
-        "\n": "NN",
-        "\r": "RR",
-        "\t": "TT",
-        # "\u": "UU", # TODO
-        "\v": "VV",
-        # "\x": "XX", # TODO
-    }
-    table: Dict[int, str] = {}
     is_fstring = source.startswith("f")
-    quotechar = source[-1]
-    line = source.lstrip("f")[1:-1]
+    return _split_kinds(clean_sentences, sentence_kinds, is_fstring)
+
+
+def _split_kinds(
+    sentences: List[str], sentence_kinds: List[int], is_fstring: bool
+) -> Tuple[List[str], List[int]]:
+    """Return the sentences as text and the indices of the f-strings"""
+    f_indices = [i for i, k in enumerate(sentence_kinds) if k == Kind.FORMAT]
+
+    # Sentences of an f-string that don't become f-strings themselves need
+    # their doubled braces undone.
     if is_fstring:
-        new_source = ["f"]
-    new_source.append(quotechar)
+        sentences = [
+            s if k == Kind.FORMAT else unescape_braces(s)
+            for s, k in zip(sentences, sentence_kinds)
+        ]
 
-    for i, s in enumerate(line):
-        if s in translations:
-            c = translations[s]
-            table[i] = s
-        else:
-            c = s
-        new_source.append(c)
+    return sentences, f_indices
 
-    new_source.append(quotechar)
-    output = "".join(new_source)
-    return output, table
 
+@timed("translate")
+def translate_source(source: str) -> Tuple[str, EscapeMap]:
+    """Protect the escape sequences in the source from being broken
+
+    Returns the source with the spaces inside escape sequences replaced by a
+    placeholder, and the map of escape sequences in the content of the
+    source. The translated source has the same length as the original.
+    """
+    is_fstring, quote, content = split_literal(source)
+    table = EscapeMap(content)
+    masked = table.mask(content)
+    if masked is content:
+        return source, table
+    prefix = "f" if is_fstring else ""
+    return prefix + quote + masked + quote, table
+
+
+@timed("untranslate")
+def untranslate_source(lines: List[str], table: EscapeMap) -> List[str]:
+    """Restore the spaces in escape sequences that translate_source masked"""
+    if not table.masked:
+        return lines
+    return [
+        line.replace(PLACEHOLDER, " ") if PLACEHOLDER in line else line
+        for line in lines
+    ]
+
+
+def report_error(err: Exception) -> None:
+    print(f"[StringWrap] ERROR: {err}", file=sys.stderr)
+
+
+def _cached(key: Hashable, func: Callable, *args) -> Optional[List[str]]:
+    result = _RESULT_CACHE.get(key)
+    if result is None:
+        try:
+            result = func(*args)
+        except InputError as err:
+            report_error(err)
+            return None
+        _RESULT_CACHE.put(key, result)
+    return result
+
+
+def string_wrap(
+    line: str, text_width: int, engine: str = DEFAULT_ENGINE
+) -> Optional[List[str]]:
+    key = ("wrap", line, text_width, engine)
+    return _cached(key, _string_wrap, line, text_width, engine)
+
+
+def string_unwrap(lines: List[str]) -> Optional[List[str]]:
+    return _cached(("unwrap", tuple(lines)), _string_unwrap, lines)
+
+
+def string_rewrap(
+    lines: List[str], text_width: int, engine: str = DEFAULT_ENGINE
+) -> Optional[List[str]]:
+    key = ("rewrap", tuple(lines), text_width, engine)
+    return _cached(key, _string_rewrap, lines, text_width, engine)
+
+
+class WrapResult(tuple):
+    """Result of one item of a batch, either lines or an error message"""
+
+    __slots__ = ()
+
+    def __new__(
+        cls, lines: Optional[List[str]], error: Optional[str]
+    ) -> WrapResult:
+        return tuple.__new__(cls, (lines, error))
+
+    lines = property(itemgetter(0))
+    error = property(itemgetter(1))
+
+
+def wrap_many(
+    lines: Sequence[str],
+    text_width: Union[int, Sequence[int]],
+    engine: str = DEFAULT_ENGINE,
+) -> List[WrapResult]:
+    """Wrap many single-line strings, see string_wrap
+
+    The text width is either shared by all the lines or given per line. The
+    results are returned in order and failures are reported in the results,
+    nothing is printed.
+    """
+    return _run_many(_string_wrap, lines, text_width, engine)
+
+
+def rewrap_many(
+    blocks: Sequence[Sequence[str]],
+    text_width: Union[int, Sequence[int]],
+    engine: str = DEFAULT_ENGINE,
+) -> List[WrapResult]:
+    """Rewrap many blocks of lines, see string_rewrap and wrap_many"""
+    items = [tuple(block) for block in blocks]
+    return _run_many(_string_rewrap, items, text_width, engine)
+
+
+def unwrap_many(blocks: Sequence[Sequence[str]]) -> List[WrapResult]:
+    """Unwrap many blocks of lines, see string_unwrap and wrap_many"""
+    items = [tuple(block) for block in blocks]
+    return _run_many(_unwrap_item, items, 0, DEFAULT_ENGINE)
+
+
+def _unwrap_item(
+    lines: Sequence[str], text_width: int, engine: str
+) -> List[str]:
+    return _string_unwrap(lines)
+
+
+def _run_many(
+    func: Callable,
+    items: Sequence[Hashable],
+    text_width: Union[int, Sequence[int]],
+    engine: str,
+) -> List[WrapResult]:
+    # An unknown engine is a usage error, not a per-item failure
+    get_engine(engine)
+    if isinstance(text_width, int):
+        widths: Sequence[int] = [text_width] * len(items)
+    else:
+        widths = text_width
+        if len(widths) != len(items):
+            raise ValueError(
+                f"Expected {len(items)} text widths, got {len(widths)}"
+            )
+
+    # Identical items are only wrapped once, bypassing the memo cache which
+    # would cost a lock and an eviction per item
+    done = {}
+    results = []
+    for item, width in zip(items, widths):
+        key = (item, width)
+        result = done.get(key)
+        if result is not None:
+            # Each item gets its own list of lines
+            if result.lines is not None:
+                result = WrapResult(list(result.lines), None)
+        else:
+            try:
+                result = WrapResult(func(item, width, engine), None)
+            except (
+                InputError,
+                TokenizeError,
+                UnsupportASTLiteralError,
+                SyntaxError,
+            ) as err:
+                result = WrapResult(None, str(err))
+            done[key] = result
+        results.append(result)
+    return results
+
+
+@timed("wrap")
+def _string_wrap(
+    line: str, text_width: int, engine: str = DEFAULT_ENGINE
+) -> List[str]:
+    # Fail early on an unknown engine
+    breaker = get_engine(engine)
+
+    source = line.rstrip(",").strip()
+    indent_len = len(line) - len(line.lstrip(" "))
+    if (
+        breaker is break_tokens
+        and _is_simple(source)
+        and line.startswith(source, indent_len)
+    ):
+        # Most strings are plain ASCII strings on their own line, which need
+        # no quote detection, translation, tokens or f-string handling
+        indent = " " * indent_len
+        quote = source[0]
+        width = text_width - indent_len - 2
+        indented = [
+            indent + quote + sentence + quote
+            for sentence in _break_simple(source[1:-1], width)
+        ]
+        if line.endswith(","):
+            indented[-1] += ","
+        return indented
 
-def untranslate_source(lines: List[str], table: Dict[int, str]) -> List[str]:
-    i = 0
-    new_lines = []
-    for line in lines:
-        new_line = ""
-        skip_next = False
-        for s in line:
-            if i in table:
-                c = table[i]
-                i += 1
-                skip_next = True
-                new_line += c
-            else:
-                if skip_next:
-                    skip_next = False
-                    continue
-                c = s
-                i += 1
-                new_line += c
-        new_lines.append(new_line)
-    return new_lines
-
-
-def string_wrap(line: str, text_width: int) -> Optional[List[str]]:
     # Figure out which quote mark the line is using
-    info = identify_start_and_quote([line])
-    if info is None or info.quote_str is None:
-        return None
+    info = _identify_start_and_quote([line])
 
     indent = " " * info.indent_len
 
-    source = line.rstrip(",").strip()
+    width = text_width - len(indent) - 2
     tmp_source, table = translate_source(source)
     wrapped, f_indices = wrap_text(
         tmp_source,
-        width=text_width - len(indent) - 2,
+        width=width,
         table=table,
+        engine=engine,
     )
-    quoted = [info.quote_str + line + info.quote_str for line in wrapped]
-    fstringed = []
-    for i, line in enumerate(quoted):
-        if i in f_indices:
-            fstringed.append("f" + line)
-        else:
-            fstringed.append(line)
-    indented = [indent + line for line in fstringed]
+    return _quote_lines(info, wrapped, f_indices)
+
+
+def _quote_lines(
+    info: InputInfo, wrapped: List[str], f_indices: List[int]
+) -> List[str]:
+    """Turn the wrapped sentences into lines of code, in place"""
+    indent = " " * info.indent_len
+    quote = info.quote_str
+    f_set = set(f_indices)
+    # Replacing the sentences one by one frees them as the lines are made
+    for i, line in enumerate(wrapped):
+        prefix = "f" if i in f_set else ""
+        wrapped[i] = indent + prefix + quote + line + quote
     if info.trailing_comma:
-        indented[-1] += ","
-    return indented
+        wrapped[-1] += ","
+    return wrapped
 
 
-def string_unwrap(lines: List[str]) -> Optional[List[str]]:
-    info = identify_start_and_quote(lines)
-    # startpos, quotestr, is_fstring = identify_start_and_quote(lines[0])
-    if info is None or info.quote_str is None:
-        return None
+def _unwrap_contents(lines: Sequence[str], info: InputInfo) -> List[str]:
+    """Return the contents of the literals on the lines
+
+    Joined, these are the content of the unwrapped literal.
+    """
+    clean = []
+    for line in lines:
+        text = line.strip().rstrip(",")
+        is_fstring = text.startswith("f")
+        text = text.lstrip("f")
+        # Remove exactly one quote on either side, the content may end with
+        # an escaped quote
+        if text.startswith(info.quote_str):
+            text = text[1:]
+        if text.endswith(info.quote_str):
+            text = text[:-1]
+        # Braces in a plain string are literal braces in an f-string
+        if info.is_fstring and not is_fstring:
+            text = escape_braces(text)
+        clean.append(text)
+    return clean
+
+
+@timed("unwrap")
+def _string_unwrap(lines: List[str]) -> List[str]:
+    info = _identify_start_and_quote(lines)
 
     indent = " " * info.indent_len
 
-    clean = [
-        line.strip().lstrip("f").rstrip(",").strip(info.quote_str)
-        for line in lines
-    ]
-    joined = "".join(clean)
+    joined = "".join(_unwrap_contents(lines, info))
     quoted = info.quote_str + joined + info.quote_str
     if info.is_fstring:
         quoted = "f" + quoted
@@ -278,20 +979,65 @@ def string_unwrap(lines: List[str]) -> Optional[List[str]]:
     return [indented]
 
 
-def string_rewrap(lines: List[str], text_width: int) -> Optional[List[str]]:
-    unwrapped = string_unwrap(lines)
-    if unwrapped is None:
-        return None
+@timed("rewrap")
+def _string_rewrap(
+    lines: List[str], text_width: int, engine: str = DEFAULT_ENGINE
+) -> List[str]:
+    """Rewrap the lines of a string in a single pass
 
-    theline = unwrapped[0]
-    return string_wrap(theline, text_width)
+    The result is that of wrapping the unwrapped line, but the lines are
+    analyzed once and only their contents are joined. The unwrapped line is
+    never built, quoted and analyzed again.
+    """
+    # Fail early on an unknown engine
+    breaker = get_engine(engine)
+
+    info = _identify_start_and_quote(lines)
+    if info.is_fstring and not info.indent_len:
+        # The unwrapped line isn't accepted, see _identify_start_and_quote
+        return _string_wrap(_string_unwrap(lines)[0], text_width, engine)
+
+    quote = info.quote_str
+    width = text_width - info.indent_len - 2
+    content = "".join(_unwrap_contents(lines, info))
+    if (
+        breaker is break_tokens
+        and not info.is_fstring
+        and _is_plain(content, quote)
+    ):
+        sentences = _break_simple(content, width)
+        del content
+        return _quote_lines(info, sentences, [])
+
+    table = EscapeMap(content)
+    tokens = tokenize_content(
+        table.mask(content), quote, info.is_fstring, table
+    )
+    del content
+    sentences, sentence_kinds = _break_all(breaker, tokens, width)
+    del tokens
+    wrapped, f_indices = _split_kinds(
+        untranslate_source(sentences, table), sentence_kinds, info.is_fstring
+    )
+    return _quote_lines(info, wrapped, f_indices)
 
 
 def identify_start_and_quote(lines: List[str]) -> Optional[InputInfo]:
+    try:
+        return _identify_start_and_quote(lines)
+    except InputError as err:
+        report_error(err)
+        return None
+
+
+@timed("identify")
+def _identify_start_and_quote(lines: List[str]) -> InputInfo:
     double_start = None
     single_start = None
     quote_str = None
 
+    if not lines:
+        raise InputError("no lines to wrap.")
     first_line = lines[0]
     last_line = lines[-1]
 
@@ -308,11 +1054,7 @@ def identify_start_and_quote(lines: List[str]) -> Optional[InputInfo]:
         pass
 
     if double_start is None and single_start is None:
-        print(
-            "[StringWrap] ERROR: couldn't identify quote character.",
-            file=sys.stderr,
-        )
-        return None
+        raise InputError("couldn't identify quote character.")
     elif single_start is None:
         assert double_start is not None
         start_pos = double_start
@@ -360,12 +1102,10 @@ def identify_start_and_quote(lines: List[str]) -> Optional[InputInfo]:
             indent_len=start_pos - 1,
         )
     else:
-        print(
-            "[StringWrap] ERROR: String not on its own line. "
-            f"Preceding: {first_line[:start_pos]}",
-            file=sys.stderr,
+        raise InputError(
+            "String not on its own line. "
+            f"Preceding: {first_line[:start_pos]}"
         )
-        return None
 
     for line in lines:
         if line.lstrip().startswith("f"):
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+
+from string_wrap.batch import find_files
+from string_wrap.batch import is_string_line
+from string_wrap.batch import make_chunks
+from string_wrap.batch import rewrap_file
+from string_wrap.batch import rewrap_files
+from string_wrap.batch import rewrap_source
+
+LONG = "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore et dolore magna aliqua."
+
+
+class BatchTestCase(unittest.TestCase):
+    maxDiff = None
+
+    def test_is_string_line(self):
+        self.assertTrue(is_string_line('    "foo bar"'))
+        self.assertTrue(is_string_line("    f'foo {bar}',"))
+        self.assertTrue(is_string_line('    "foo \\" bar"'))
+        self.assertFalse(is_string_line('    """foo bar"""'))
+        self.assertFalse(is_string_line('    x = "foo bar"'))
+        self.assertFalse(is_string_line('    "foo" + bar'))
+
+    def test_rewrap_source_1(self):
+        source = (
+            "def f():\n"
+            "    raise ValueError(\n"
+            f'        "{LONG}"\n'
+            "    )\n"
+            "\n"
+            "x = (\n"
+            "    # comment\n"
+            f'    "{LONG}",\n'
+            f'    "{LONG}",\n'
+            ")\n"
+        )
+        expected = (
+            "def f():\n"
+            "    raise ValueError(\n"
+            '        "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do "\n'
+            '        "eiusmod tempor incididunt ut labore et dolore magna aliqua."\n'
+            "    )\n"
+            "\n"
+            "x = (\n"
+            "    # comment\n"
+            '    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod "\n'
+            '    "tempor incididunt ut labore et dolore magna aliqua.",\n'
+            '    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod "\n'
+            '    "tempor incididunt ut labore et dolore magna aliqua.",\n'
+            ")\n"
+        )
+        out, count = rewrap_source(source, 79)
+        self.assertEqual(count, 3)
+        self.assertEqual(out, expected)
+
+    def test_rewrap_source_2(self):
+        # Strings that are not inside brackets, not on their own line, or
+        # triple-quoted are left alone.
+        source = (
+            f'"{LONG}"\n'
+            f'x = "{LONG}"\n'
+            "def f():\n"
+            f'    """{LONG}"""\n'
+        )
+        out, count = rewrap_source(source, 79)
+        self.assertEqual(count, 0)
+        self.assertEqual(out, source)
+
+    def test_rewrap_source_3(self):
+        # Lines of triple-quoted strings are left alone, even after an
+        # opening bracket.
+        source = (
+            "def f():\n"
+            '    """Call g(\n'
+            f'        "{LONG}"\n'
+            '    """\n'
+            'x = """(\n'
+            f'    "{LONG}"\n'
+            '"""\n'
+            "# g(\n"
+            f'"{LONG}"\n'
+            'y = "("\n'
+            f'"{LONG}"\n'
+        )
+        out, count = rewrap_source(source, 79)
+        self.assertEqual(count, 0)
+        self.assertEqual(out, source)
+
+    def test_rewrap_file_1(self):
+        source = f'print(\r\n    "{LONG}"\r\n)\r\n'
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "example.py")
+            with open(path, "w", encoding="utf-8", newline="") as fp:
+                fp.write(source)
+            os.chmod(path, 0o640)
+
+            self.assertEqual(rewrap_file(path, 79, write=False), 1)
+            with open(path, "r", encoding="utf-8", newline="") as fp:
+                self.assertEqual(fp.read(), source)
+
+            self.assertEqual(rewrap_file(path, 79), 1)
+            with open(path, "r", encoding="utf-8", newline="") as fp:
+                out = fp.read()
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+            self.assertEqual(os.listdir(tmpdir), ["example.py"])
+
+        self.assertEqual(
+            out,
+            "print(\r\n"
+            '    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod "\r\n'
+            '    "tempor incididunt ut labore et dolore magna aliqua."\r\n'
+            ")\r\n",
+        )
+
+    def test_make_chunks(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = []
+            for i, size in enumerate([10, 30, 5, 5, 50, 1]):
+                path = os.path.join(tmpdir, f"{i}.py")
+                with open(path, "w") as fp:
+                    fp.write("#" * size)
+                paths.append(path)
+            chunks = make_chunks(paths, 2, chunk_bytes=40)
+        self.assertEqual(chunks, [paths[:2], paths[2:5], paths[5:]])
+
+    def test_rewrap_files(self):
+        source = f'print(\n    "{LONG}"\n)\n'
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name in ["b.py", "a.py", "c.txt", ".hidden/d.py", "e/f.py"]:
+                path = os.path.join(tmpdir, name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w") as fp:
+                    fp.write(source if name != "a.py" else "x = 1\n")
+            missing = os.path.join(tmpdir, "missing.py")
+
+            files = find_files([tmpdir, missing])
+            self.assertEqual(
+                [os.path.relpath(f, tmpdir) for f in files],
+                ["a.py", "b.py", "e/f.py", "missing.py"],
+            )
+            for jobs in [1, 2]:
+                with self.subTest(jobs=jobs):
+                    results = list(
+                        rewrap_files(
+                            files, 79, write=False, jobs=jobs, chunk_bytes=1
+                        )
+                    )
+                    self.assertEqual([r.path for r in results], files)
+                    self.assertEqual([r.count for r in results], [0, 1, 1, 0])
+                    self.assertEqual(
+                        [r.error is None for r in results],
+                        [True, True, True, False],
+                    )
+
+
+if __name__ == "__main__":
+    unittest.main()
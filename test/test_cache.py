@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from string_wrap import batch
+from string_wrap.__main__ import main
+from string_wrap.batch import rewrap_files
+from string_wrap.cache import ENTRY_OVERHEAD
+from string_wrap.cache import ResultCache
+
+LONG = "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore et dolore magna aliqua."
+
+
+class ResultCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = self._tmpdir.name
+        self.cache_dir = os.path.join(self.tmpdir, "cache")
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_get_put(self):
+        with ResultCache(self.cache_dir) as cache:
+            self.assertIsNone(cache.get("a"))
+            cache.put("a", 0, "ignored")
+            cache.put("b", 2, "output")
+            self.assertEqual(cache.get("a"), (0, None))
+
+        with ResultCache(self.cache_dir) as cache:
+            self.assertEqual(cache.get("a"), (0, None))
+            self.assertEqual(cache.get("b"), (2, "output"))
+            self.assertIsNone(cache.get("c"))
+            self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_eviction(self):
+        max_bytes = 2 * ENTRY_OVERHEAD + 10
+        with ResultCache(self.cache_dir, max_bytes=max_bytes) as cache:
+            cache.put("a", 1, "12345")
+            cache.put("b", 1, "12345")
+        with ResultCache(self.cache_dir, max_bytes=max_bytes) as cache:
+            # Using "a" makes "b" the least recently used entry
+            self.assertIsNotNone(cache.get("a"))
+            cache.put("c", 0, None)
+        with ResultCache(self.cache_dir, max_bytes=max_bytes) as cache:
+            self.assertIsNotNone(cache.get("a"))
+            self.assertIsNone(cache.get("b"))
+            self.assertIsNotNone(cache.get("c"))
+
+    def test_rewrap_files_cached(self):
+        paths = []
+        for name, source in [
+            ("a.py", "x = 1\n"),
+            ("b.py", f'print(\n    "{LONG}"\n)\n'),
+        ]:
+            path = os.path.join(self.tmpdir, name)
+            with open(path, "w") as fp:
+                fp.write(source)
+            paths.append(path)
+
+        def run(**kwargs):
+            with ResultCache(self.cache_dir) as cache:
+                results = rewrap_files(
+                    paths, 79, jobs=1, cache=cache, **kwargs
+                )
+                counts = [r.count for r in results]
+            return counts, (cache.hits, cache.misses)
+
+        self.assertEqual(run(write=False), ([0, 1], (0, 2)))
+
+        # Cached files are not parsed again, and cached output is written
+        with mock.patch.object(batch, "rewrap_source") as rewrap_source:
+            self.assertEqual(run(write=True), ([0, 1], (2, 0)))
+            rewrap_source.assert_not_called()
+        with open(paths[1], "r") as fp:
+            self.assertEqual(len(fp.read().splitlines()), 4)
+
+        # The rewrapped file has a new hash
+        self.assertEqual(run(write=True), ([0, 0], (1, 1)))
+
+    def test_main_without_cache(self):
+        path = os.path.join(self.tmpdir, "a.py")
+        with open(path, "w") as fp:
+            fp.write(f'print(\n    "{LONG}"\n)\n')
+        # The cache directory can't be created below a file
+        cache_dir = os.path.join(path, "cache")
+        stderr = io.StringIO()
+        stdout = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            with contextlib.redirect_stdout(stdout):
+                status = main(
+                    ["--check", "-j", "1", "--cache-dir", cache_dir, path]
+                )
+        self.assertEqual(status, 1)
+        self.assertIn("not using the cache", stderr.getvalue())
+        self.assertIn("Would rewrap 1 string(s)", stdout.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
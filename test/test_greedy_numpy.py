@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+import random
+import unittest
+
+from unittest import mock
+
+from string_wrap import wrapper
+from string_wrap.wrapper import GreedyBreaker
+from string_wrap.wrapper import tokenize
+from string_wrap.wrapper import translate_source
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+WORDS = [
+    "a",
+    "bb",
+    "ccc",
+    "dddddddddddd",
+    " ",
+    "  ",
+    "{x}",
+    "{y!r}",
+    "{z=}",
+    "{a_very_long_name_for_a_field}",
+    "\\N{EM DASH}",
+    "{{",
+    "é",
+    "漢字",
+    "e\u0301",
+]
+
+
+def python_break_tokens(tokens, width):
+    breaker = GreedyBreaker(width)
+    yield from breaker.feed(tokens)
+    yield breaker.finish()
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class GreedyNumpyTestCase(unittest.TestCase):
+    def test_same_as_python(self):
+        from string_wrap.greedy_numpy import break_tokens
+
+        rng = random.Random(42)
+        for _ in range(200):
+            content = "".join(rng.choice(WORDS) for _ in range(40))
+            source, table = translate_source('f"' + content + '"')
+            tokens = tokenize(source, table)
+            for width in (1, 2, 5, 13, 30):
+                with self.subTest(content=content, width=width):
+                    self.assertEqual(
+                        list(break_tokens(tokens, width)),
+                        list(python_break_tokens(tokens, width)),
+                    )
+
+    def test_string_wrap(self):
+        from string_wrap.greedy_numpy import break_tokens
+
+        line = (
+            '    f"Lorem ipsum {dolor} sit amet, consectetur adipiscing '
+            'elit, sed do {eiusmod!r} tempor incididunt ut labore et dolore "'
+        )
+        # The memo cache of string_wrap is bypassed, so that both calls wrap
+        expected = wrapper._string_wrap(line, 40)
+        numpy_break_tokens = mock.Mock(wraps=break_tokens)
+        with mock.patch.object(wrapper, "NUMPY_MIN_TOKENS", 0):
+            with mock.patch.object(
+                wrapper, "_NUMPY_BREAK_TOKENS", numpy_break_tokens
+            ):
+                self.assertEqual(wrapper._string_wrap(line, 40), expected)
+        numpy_break_tokens.assert_called_once()
+
+
+class FallbackTestCase(unittest.TestCase):
+    def test_without_numpy(self):
+        # An f-string, as plain strings don't use break_tokens at all
+        content = "lorem {ipsum} dolor sit amet " * 100
+        source, table = translate_source('f"' + content + '"')
+        tokens = tokenize(source, table)
+        expected = list(python_break_tokens(tokens, 30))
+        breaker = mock.Mock(wraps=GreedyBreaker)
+        with mock.patch.object(wrapper, "NUMPY_MIN_TOKENS", 0):
+            with mock.patch.object(wrapper, "_NUMPY_BREAK_TOKENS", None):
+                with mock.patch.object(wrapper, "GreedyBreaker", breaker):
+                    self.assertEqual(
+                        list(wrapper.break_tokens(tokens, 30)), expected
+                    )
+        breaker.assert_called_once_with(30)
+
+if __name__ == "__main__":
+    unittest.main()
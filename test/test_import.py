@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+PYTHON_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "python"
+)
+
+# Budget for importing the package, in microseconds. This excludes the
+# standard modules that any host process has loaded already.
+IMPORT_BUDGET_US = 5000
+
+PRELOADED = "import re, threading"
+
+# Modules that are only needed for some inputs or by the command line tools
+LAZY_MODULES = [
+    "ast",
+    "dataclasses",
+    "typing",
+    "numpy",
+    "concurrent.futures",
+    "sqlite3",
+    "tempfile",
+    "unicodedata",
+    "string_wrap._width_table",
+    "string_wrap.batch",
+    "string_wrap.cache",
+]
+
+
+class ImportTestCase(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.env = dict(os.environ)
+        self.env.pop("PYTHONDONTWRITEBYTECODE", None)
+        self.env["PYTHONPATH"] = PYTHON_DIR
+        # Measure imports from bytecode, as in an installed package
+        self.env["PYTHONPYCACHEPREFIX"] = tmpdir.name
+
+    def run_python(self, *args):
+        return subprocess.run(
+            [sys.executable, *args],
+            env=self.env,
+            capture_output=True,
+            check=True,
+            encoding="utf-8",
+        )
+
+    def test_lazy_modules(self):
+        code = (
+            "import sys, string_wrap.vim_bridge; "
+            "print('\\n'.join(sys.modules))"
+        )
+        modules = set(self.run_python("-c", code).stdout.split())
+        for name in LAZY_MODULES:
+            with self.subTest(name=name):
+                self.assertNotIn(name, modules)
+
+    def test_import_time(self):
+        code = PRELOADED + "; import string_wrap"
+        self.run_python("-c", code)
+        times = []
+        for _ in range(5):
+            stderr = self.run_python("-X", "importtime", "-c", code).stderr
+            # import time: self [us] | cumulative | imported package
+            for line in stderr.splitlines():
+                _, cumulative, name = line.split("|")
+                if name.strip() == "string_wrap":
+                    times.append(int(cumulative))
+        self.assertEqual(len(times), 5)
+        self.assertLess(min(times), IMPORT_BUDGET_US)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from string_wrap.lexer import FIELD
+from string_wrap.lexer import LITERAL
+from string_wrap.lexer import PLACEHOLDER
+from string_wrap.lexer import EscapeMap
+from string_wrap.lexer import TokenizeError
+from string_wrap.lexer import escape_braces
+from string_wrap.lexer import iter_parts
+from string_wrap.lexer import split_literal
+from string_wrap.lexer import unescape_braces
+from string_wrap.wrapper import Kind
+from string_wrap.wrapper import tokenize
+
+
+def parts(source):
+    is_fstring, quote, content = split_literal(source)
+    return [
+        (kind, content[start:end])
+        for kind, start, end in iter_parts(content, quote, is_fstring)
+    ]
+
+
+class LexerTestCase(unittest.TestCase):
+    def test_split_literal(self):
+        self.assertEqual(split_literal('f"a b"'), (True, '"', "a b"))
+        self.assertEqual(split_literal("''"), (False, "'", ""))
+        for source in ['"a', "f'a\"", "x", 'r"a"']:
+            with self.subTest(source=source):
+                with self.assertRaises(TokenizeError):
+                    split_literal(source)
+
+    def test_iter_parts_1(self):
+        self.assertEqual(parts('"a {b} \\" c"'), [(LITERAL, 'a {b} \\" c')])
+        self.assertEqual(
+            parts('f"a {b} {{c}} {d!r:>{w}}{e[\'}\']}"'),
+            [
+                (LITERAL, "a "),
+                (FIELD, "{b}"),
+                (LITERAL, " {{c}} "),
+                (FIELD, "{d!r:>{w}}"),
+                (FIELD, "{e['}']}"),
+            ],
+        )
+        self.assertEqual(
+            parts('f"\\N{EM DASH} {x:%H:%M} {(lambda y: y)(1)}"'),
+            [
+                (LITERAL, "\\N{EM DASH} "),
+                (FIELD, "{x:%H:%M}"),
+                (LITERAL, " "),
+                (FIELD, "{(lambda y: y)(1)}"),
+            ],
+        )
+
+    def test_iter_parts_2(self):
+        for source in [
+            '"a " b"',
+            '"a \\"',
+            'f"a } b"',
+            'f"a {b"',
+            'f"a {b[}"',
+            'f"a {"b"}"',
+        ]:
+            with self.subTest(source=source):
+                with self.assertRaises(TokenizeError):
+                    parts(source)
+
+    def test_escape_map(self):
+        content = "a\\tb\\x41 \\N{EM DASH}\\\\\\101\\ q\\x4"
+        escapes = EscapeMap(content)
+        self.assertEqual(
+            [content[s:e] for s, e in zip(escapes.starts, escapes.ends)],
+            ["\\t", "\\x41", "\\N{EM DASH}", "\\\\", "\\101", "\\ ", "\\x"],
+        )
+        self.assertEqual(escapes.find(0), -1)
+        self.assertEqual(escapes.find(1), 3)
+        self.assertEqual(escapes.find(2), 3)
+        self.assertEqual(escapes.find(3), -1)
+        self.assertEqual(escapes.find(12), 20)
+        self.assertEqual(
+            escapes.mask(content),
+            content.replace("EM DASH", "EM" + PLACEHOLDER + "DASH").replace(
+                "\\ ", "\\" + PLACEHOLDER
+            ),
+        )
+        self.assertEqual(escapes.masked, 2)
+
+    def test_braces(self):
+        self.assertEqual(
+            escape_braces("a {b} \\N{EM DASH}"), "a {{b}} \\N{EM DASH}"
+        )
+        self.assertEqual(
+            unescape_braces("a {{b}} \\N{EM DASH}}}"), "a {b} \\N{EM DASH}}"
+        )
+
+    def test_tokenize(self):
+        tokens = tokenize('f"a  {b} {c=} d "')
+        self.assertEqual(
+            [(t.kind, t.value, t.trailing_space) for t in tokens],
+            [
+                (Kind.REGULAR, "a", True),
+                (Kind.REGULAR, "", True),
+                (Kind.FORMAT, "{b}", False),
+                (Kind.REGULAR, "", True),
+                (Kind.FORMAT, "{c=}", True),
+                (Kind.REGULAR, "d", True),
+            ],
+        )
+
+    def test_token_list(self):
+        # A run of spaces after a field is collapsed to its trailing space
+        tokens = tokenize('f"a  {b}   {c=} d "')
+        self.assertEqual(tokens.text, "a  {b}  {c=} d ")
+        self.assertEqual(len(tokens), 6)
+        for token, start, end in zip(tokens, tokens.starts, tokens.ends):
+            self.assertEqual(tokens.text[start:end], token.value)
+        self.assertEqual(tokens[-1].value, "d")
+
+    def test_token_list_empty(self):
+        tokens = tokenize('""')
+        self.assertEqual(
+            [(t.kind, t.value, t.trailing_space) for t in tokens],
+            [(Kind.REGULAR, "", False)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
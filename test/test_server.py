@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import unittest
+
+from string_wrap.server import Server
+
+PYTHON_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "python"
+)
+
+LONG = '    "Lorem ipsum dolor sit amet, consectetur adipiscing elit",'
+
+
+class StdioClient:
+    """Test client that talks to the server in a subprocess"""
+
+    def __init__(self):
+        env = dict(os.environ)
+        env["PYTHONPATH"] = PYTHON_DIR
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "string_wrap.server"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+            encoding="utf-8",
+        )
+        self.next_id = 0
+
+    def request(self, method, **params):
+        self.next_id += 1
+        message = {"id": self.next_id, "method": method, "params": params}
+        self.proc.stdin.write(json.dumps(message) + "\n")
+        self.proc.stdin.flush()
+        response = json.loads(self.proc.stdout.readline())
+        self.assert_id(response)
+        return response
+
+    def assert_id(self, response):
+        if response["id"] != self.next_id:
+            raise AssertionError(f"Unexpected response: {response}")
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait(timeout=10)
+        self.proc.stdout.close()
+
+
+class ServerTestCase(unittest.TestCase):
+    maxDiff = None
+
+    def test_stdio(self):
+        client = StdioClient()
+        self.addCleanup(client.close)
+        self.assertIn("optimal", client.request("engines")["result"])
+        wrapped = client.request("wrap", line=LONG, text_width=40)
+        self.assertEqual(
+            wrapped["result"],
+            [
+                '    "Lorem ipsum dolor sit amet, "',
+                '    "consectetur adipiscing elit",',
+            ],
+        )
+        self.assertEqual(
+            client.request("unwrap", lines=wrapped["result"])["result"],
+            [LONG],
+        )
+        self.assertEqual(
+            client.request(
+                "wrap_all", lines=["x = (", LONG, ")"], text_width=40
+            )["result"],
+            [[1, wrapped["result"]]],
+        )
+        response = client.request("wrap", line="x = " + LONG, text_width=40)
+        self.assertIn("not on its own line", response["error"])
+        response = client.request(
+            "rewrap", lines=[LONG], text_width=40, engine="unknown"
+        )
+        self.assertIn("Unknown wrapping engine", response["error"])
+        self.assertIn("Invalid params", client.request("wrap")["error"])
+        self.assertIn("Unknown method", client.request("foo")["error"])
+        # The timers are disabled without --stats
+        self.assertEqual(client.request("stats")["result"], {})
+        self.assertEqual(client.request("shutdown")["result"], True)
+        self.assertEqual(client.proc.wait(timeout=10), 0)
+
+    def test_cancel(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def block(params):
+            started.set()
+            release.wait(10)
+            return True
+
+        def requests():
+            yield json.dumps({"id": 1, "method": "block"}) + "\n"
+            started.wait(10)
+            yield json.dumps({"id": 2, "method": "engines"}) + "\n"
+            yield json.dumps(
+                {"id": 3, "method": "cancel", "params": {"id": 2}}
+            ) + "\n"
+            yield json.dumps(
+                {"id": 4, "method": "cancel", "params": {"id": 1}}
+            ) + "\n"
+            yield json.dumps(
+                {"id": 5, "method": "cancel", "params": {"id": 1}}
+            ) + "\n"
+            release.set()
+
+        outfile = io.StringIO()
+        server = Server(requests(), outfile)
+        server._methods["block"] = block
+        server.serve()
+        lines = outfile.getvalue().splitlines()
+        responses = [json.loads(line) for line in lines]
+        self.assertEqual(
+            responses,
+            [
+                {"id": 3, "result": True},
+                {"id": 4, "result": True},
+                {"id": 5, "result": False},
+            ],
+        )
+
+    def test_internal_error(self):
+        def fail(params):
+            raise IndexError("list index out of range")
+
+        requests = [
+            json.dumps({"id": 1, "method": "fail"}) + "\n",
+            json.dumps({"id": 2, "method": "wrap", "params": {}}) + "\n",
+            json.dumps({"id": 3, "method": "engines"}) + "\n",
+        ]
+        outfile = io.StringIO()
+        server = Server(iter(requests), outfile)
+        server._methods["fail"] = fail
+        server.serve()
+        lines = outfile.getvalue().splitlines()
+        responses = [json.loads(line) for line in lines]
+        self.assertEqual([r["id"] for r in responses], [1, 2, 3])
+        self.assertIn("Internal error: IndexError", responses[0]["error"])
+        self.assertIn("Invalid params", responses[1]["error"])
+        self.assertIn("optimal", responses[2]["result"])
+
+
+if __name__ == "__main__":
+    unittest.main()
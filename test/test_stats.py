@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from string_wrap import stats
+from string_wrap.wrapper import cache_clear
+from string_wrap.wrapper import string_rewrap
+from string_wrap.wrapper import string_unwrap
+from string_wrap.wrapper import string_wrap
+
+LINE = '    f"Lorem ipsum {dolor} sit amet, consectetur adipiscing elit \\t sed"'
+
+
+class StatsTestCase(unittest.TestCase):
+    def setUp(self):
+        cache_clear()
+        stats.reset()
+        self.addCleanup(stats.enable, stats.is_enabled())
+        self.addCleanup(stats.reset)
+
+    def test_disabled(self):
+        stats.enable(False)
+        string_wrap(LINE, 40)
+        self.assertEqual(stats.summary(), {})
+
+    def test_enabled(self):
+        stats.enable()
+        lines = string_wrap(LINE, 40)
+        string_rewrap(lines, 50)
+        string_unwrap(lines)
+        summary = stats.summary()
+        for stage in [
+            "identify",
+            "translate",
+            "tokenize",
+            "ast",
+            "break",
+            "untranslate",
+            "wrap",
+            "unwrap",
+            "rewrap",
+        ]:
+            with self.subTest(stage=stage):
+                self.assertIn(stage, summary)
+        # Rewrapping doesn't go through unwrap and wrap
+        self.assertEqual(summary["wrap"].count, 1)
+        self.assertEqual(summary["unwrap"].count, 1)
+        self.assertEqual(summary["rewrap"].count, 1)
+        self.assertGreaterEqual(summary["wrap"].total, summary["wrap"].p99)
+
+    def test_percentiles(self):
+        for i in range(1, 201):
+            stats.record("stage", i / 1000)
+        summary = stats.summary()["stage"]
+        self.assertEqual(summary.count, 200)
+        self.assertAlmostEqual(summary.total, 20.1)
+        self.assertEqual(summary.p50, 0.1)
+        self.assertEqual(summary.p99, 0.198)
+        lines = stats.format_summary(stats.summary())
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith("stage"))
+
+
+if __name__ == "__main__":
+    unittest.main()
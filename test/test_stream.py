@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+import io
+import tracemalloc
+import unittest
+
+from string_wrap.lexer import TokenizeError
+from string_wrap.stream import wrap_stream
+from string_wrap.wrapper import string_wrap
+
+LINES = [
+    '    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do '
+    'eiusmod tempor incididunt ut labore et dolore magna aliqua",',
+    "        'Lorem  ipsum   dolor sit amet, consectetur adipiscing elit, "
+    "sed do eiusmod tempor incididunt ut labore et dolore magna aliqua  '",
+    '    f"Lorem ipsum {dolor} sit {amet!r}, consectetur {adipiscing=} elit,'
+    ' sed {do:>{eiusmod}}   tempor {{incididunt}} ut {labore} et dolore"',
+    '    "Escapes\\N{EM DASH}like\\N{LATIN SMALL LETTER E WITH ACUTE} and '
+    '\\n\\t and \\x41 and\\ space \\\\ are never broken apart at all",',
+    '    f"{a} {b} {c}   {d} {e} {f} {g} {h} {i} {j} {k} {l} {m} {n} {o}"',
+    '    "Supercalifragilisticexpialidocious is too long for a line"',
+    '    "Ünïcödé wörds ärë fïnë tôö, ëvën whën thë chünks splït thëm"',
+    '    "漢字の テスト 文章 です、 한국어 문장 입니다 und cafe\u0301 auch"',
+    '    ""',
+]
+
+
+class SizedSource:
+    """A file with a literal of the given size that is made while reading"""
+
+    def __init__(self, size):
+        self._left = size
+        self._state = "head"
+
+    def read(self, n):
+        if self._state == "head":
+            self._state = "content"
+            return b'    "'
+        if self._left > 0:
+            words = "lorem ipsum dolor sit amet " * (n // 27 + 1)
+            self._left -= len(words)
+            return words.encode()
+        if self._state == "content":
+            self._state = "done"
+            return b'",\n'
+        return b""
+
+
+class CountingFile:
+    def __init__(self):
+        self.lines = 0
+
+    def write(self, text):
+        self.lines += text.count("\n")
+
+
+class StreamTestCase(unittest.TestCase):
+    maxDiff = None
+
+    def wrap(self, data, width, chunk_size):
+        out = io.StringIO()
+        count = wrap_stream(data, out, width, chunk_size=chunk_size)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(count, len(lines))
+        return lines
+
+    def test_same_as_string_wrap(self):
+        for line in LINES:
+            for width in (20, 40, 79):
+                expected = string_wrap(line, width)
+                for chunk_size in (1, 7, 64):
+                    with self.subTest(
+                        line=line, width=width, chunk_size=chunk_size
+                    ):
+                        self.assertEqual(
+                            self.wrap(io.StringIO(line), width, chunk_size),
+                            expected,
+                        )
+
+    def test_binary(self):
+        # The UTF-8 sequences are split between chunks
+        for line in LINES:
+            data = io.BytesIO((line + "\n").encode("utf-8"))
+            self.assertEqual(self.wrap(data, 30, 5), string_wrap(line, 30))
+
+    def test_engine(self):
+        with self.assertRaises(ValueError):
+            wrap_stream(io.StringIO(LINES[0]), io.StringIO(), 79, "optimal")
+
+    def test_invalid(self):
+        with self.assertRaises(TokenizeError):
+            wrap_stream(io.StringIO('    "a " b"'), io.StringIO(), 79)
+        with self.assertRaises(TokenizeError):
+            wrap_stream(io.StringIO('    "abc'), io.StringIO(), 79)
+
+    def test_bounded_memory(self):
+        peaks = []
+        for size in (50_000, 500_000):
+            out = CountingFile()
+            tracemalloc.start()
+            try:
+                wrap_stream(SizedSource(size), out, 79, chunk_size=16384)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+            self.assertGreater(out.lines, size // 80)
+        self.assertLess(peaks[1], 250_000)
+        self.assertLess(peaks[1], 2 * peaks[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
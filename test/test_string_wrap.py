@@ -4,10 +4,25 @@ import contextlib
 import io
 import unittest
 
+from unittest import mock
+
+from string_wrap import cache_clear
+from string_wrap import cache_info
+from string_wrap import rewrap_many
 from string_wrap import string_wrap
 from string_wrap import string_unwrap
 from string_wrap import string_rewrap
+from string_wrap import wrap_many
+from string_wrap import wrapper
+from string_wrap.wrapper import Kind
+from string_wrap.wrapper import _break_all
+from string_wrap.wrapper import break_tokens
 from string_wrap.wrapper import identify_start_and_quote
+from string_wrap.wrapper import iter_sentences
+from string_wrap.wrapper import make_sentences
+from string_wrap.wrapper import set_cache_size
+from string_wrap.wrapper import tokenize
+from string_wrap.width import display_width
 
 
 class StringWrapTestCase(unittest.TestCase):
@@ -36,6 +51,12 @@ class StringWrapTestCase(unittest.TestCase):
             "[StringWrap] ERROR: String not on its own line. Preceding: some_function(",
         )
 
+    def test_wrap_3(self):
+        self.assertEqual(string_wrap('    ""', 79), ['    ""'])
+        self.assertEqual(
+            string_wrap('    " leading space"', 79), ['    " leading space"']
+        )
+
     def test_unwrap_1(self):
         lines = [
             '                "The default behavior with multiple input columns is to plot "',
@@ -86,6 +107,52 @@ class StringWrapTestCase(unittest.TestCase):
         ]
         self.assertSequenceEqual(string_unwrap(lines), expected)
 
+    def test_optimal_1(self):
+        line = '    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam."'
+        expected = [
+            '    "Lorem ipsum dolor sit amet, consectetur adipiscing "',
+            '    "elit, sed do eiusmod tempor incididunt ut labore "',
+            '    "et dolore magna aliqua. Ut enim ad minim veniam."',
+        ]
+        self.assertSequenceEqual(string_wrap(line, 60, "optimal"), expected)
+        self.assertEqual(string_unwrap(expected), [line])
+
+    def test_optimal_2(self):
+        # Lines with a format field are one character shorter, and tokens that
+        # are too long get a line of their own.
+        line = '    f"{aaaaaaaaaaaaaaaaaaaaaaaaaa} bb cc dd {e} ffffff gg hh"'
+        expected = [
+            '    f"{aaaaaaaaaaaaaaaaaaaaaaaaaa} "',
+            '    f"bb cc dd {e} "',
+            '    "ffffff gg hh"',
+        ]
+        self.assertSequenceEqual(string_wrap(line, 20, "optimal"), expected)
+
+    def test_engine_unknown(self):
+        with self.assertRaises(ValueError):
+            string_wrap('    "foo bar"', 79, "nonexistent")
+
+    def test_escapes_1(self):
+        # Escape sequences are kept as they are and never broken
+        line = '    "foo\\nbar baz qux \\x41 \\N{EM DASH} \\" q"'
+        expected = [
+            '    "foo\\nbar baz qux "',
+            '    "\\x41 \\N{EM DASH} "',
+            '    "\\" q"',
+        ]
+        self.assertSequenceEqual(string_wrap(line, 24), expected)
+        self.assertSequenceEqual(string_unwrap(expected), [line])
+
+    def test_escapes_2(self):
+        # Doubled braces are only kept on lines that remain f-strings
+        line = '    f"{{x}} some more text here {a} text {{y}}"'
+        expected = [
+            '    "{x} some more text "',
+            '    f"here {a} text {{y}}"',
+        ]
+        self.assertSequenceEqual(string_wrap(line, 30), expected)
+        self.assertSequenceEqual(string_unwrap(expected), [line])
+
     def test_round_trip_1(self):
         line = '        "The default behavior with multiple input columns is to plot each column as a separate line, and use a horizontal axis of sequential integer values. With this option, the user can specify that the first column in the input data stream should be used as the horizontal axis."'
         out = string_unwrap(string_wrap(line, 60))
@@ -99,6 +166,89 @@ class StringWrapTestCase(unittest.TestCase):
         self.assertEqual(info.quote_str, '"')
         self.assertFalse(info.is_fstring)
 
+    def test_sentences_1(self):
+        source = 'f"aa bb {foo} cc dd ee"'
+        expected = [
+            ("aa bb ", Kind.REGULAR),
+            ("{foo} cc ", Kind.FORMAT),
+            ("dd ee", Kind.REGULAR),
+        ]
+        it = iter_sentences(source, 10)
+        self.assertEqual(next(it), expected[0])
+        self.assertEqual(list(it), expected[1:])
+        sentences, kinds = make_sentences(source, 10)
+        self.assertEqual(list(zip(sentences, kinds)), expected)
+
+    def test_sentences_simple(self):
+        # Plain strings skip the tokens, with the same result
+        sources = [
+            '""',
+            '"aa bb cc dd ee"',
+            '"  aa  bb   cc dd  "',
+            "'aaaaaaaaaaaa bb cccccccccccc \"d\"'",
+            '"aaaaaaaaaaaa"',
+        ]
+        for source in sources:
+            tokens = tokenize(source)
+            for width in (-1, 0, 1, 2, 5, 10, 79):
+                with self.subTest(source=source, width=width):
+                    self.assertEqual(
+                        make_sentences(source, width),
+                        _break_all(break_tokens, tokens, width),
+                    )
+                    self.assertEqual(
+                        list(iter_sentences(source, width)),
+                        list(break_tokens(tokens, width)),
+                    )
+
+    def test_plain_fast_path(self):
+        # Plain ASCII strings skip the general pipeline, with the same result
+        lines = [
+            '    "aa bb cc dd ee ff gg hh ii jj kk ll"',
+            "        'aa  bb   cc dd  ',",
+            '"aaaaaaaaaaaa bb cccccccccccc"  ,',
+            '    ""',
+            '\t"aa bb cc dd ee ff gg hh ii jj kk ll"',
+            'x = "aa bb cc dd ee ff gg hh ii jj kk ll"',
+            '    "aa bb cc d\u00e9 ee ff gg hh ii jj kk ll"',
+            '    "aa bb cc dé ee ff gg hh ii jj kk ll"',
+        ]
+
+        def wrap(line, width):
+            try:
+                return wrapper._string_wrap(line, width)
+            except Exception as err:
+                return type(err)
+
+        for line in lines:
+            for width in (1, 10, 20, 79):
+                with self.subTest(line=line, width=width):
+                    expected = wrap(line, width)
+                    with mock.patch.object(
+                        wrapper, "_is_simple", return_value=False
+                    ):
+                        self.assertEqual(wrap(line, width), expected)
+
+    def test_display_width(self):
+        # Wide characters take two columns and combining marks none
+        line = (
+            '    "\u6f22\u5b57\u306e\u6587 \u30c6\u30b9\u30c8 '
+            "\u3067\u3059 cafe\u0301 \ud55c\uad6d\uc5b4 "
+            '\u6587\u7ae0 \u3067\u3059 \u6f22\u5b57 \u30c6\u30b9\u30c8"'
+        )
+        expected = [
+            '    "\u6f22\u5b57\u306e\u6587 \u30c6\u30b9\u30c8 "',
+            '    "\u3067\u3059 cafe\u0301 \ud55c\uad6d\uc5b4 "',
+            '    "\u6587\u7ae0 \u3067\u3059 \u6f22\u5b57 "',
+            '    "\u30c6\u30b9\u30c8"',
+        ]
+        self.assertEqual(string_wrap(line, 25), expected)
+        for engine in ("greedy", "optimal"):
+            out = string_wrap("    f" + line.lstrip(), 25, engine)
+            self.assertEqual(len(out), 4)
+            for wrapped in out:
+                self.assertLessEqual(display_width(wrapped), 25)
+
     def test_fstrings_1(self):
         line = '    f"aa bb {foo} cc dd ee"'
         out = string_wrap(line, 60)
@@ -161,6 +311,20 @@ class StringWrapTestCase(unittest.TestCase):
         ]
         self.assertSequenceEqual(string_wrap(line, 79), expected)
 
+    def test_fstrings_8(self):
+        # Replacement fields are kept as they were written
+        line = (
+            '    f"Spacing { value!r:>{ width }} and {x = } and {d[\'k\']} '
+            'is kept as the user wrote it in the source",'
+        )
+        expected = [
+            '    f"Spacing { value!r:>{ width }} "',
+            "    f\"and {x = } and {d['k']} is kept \"",
+            '    "as the user wrote it in the source",',
+        ]
+        self.assertSequenceEqual(string_wrap(line, 40), expected)
+        self.assertEqual(string_unwrap(expected), [line])
+
     def test_trailing_comma_1(self):
         expected = [
             '    f"Lorem ipsum dolor sit amet {consectetur} adipiscing elit sed doo eiusmo "',
@@ -196,6 +360,146 @@ class StringWrapTestCase(unittest.TestCase):
         ]
         self.assertSequenceEqual(string_rewrap(lines, 79), expected)
 
+    def test_rewrap_same_as_round_trip(self):
+        # Rewrapping gives the lines of wrapping the unwrapped line
+        blocks = [
+            ['    "aa bb "', '    "cc dd ee "', '    "ff"'],
+            ["    'aa bb '", "    'c\u0301c \u6f22\u5b57 '", "    'ff',"],
+            ['    f"aa {bb} "', '    "cc {dd} "', '    f"{ee!r:>{w}} ff"'],
+            ['    "aa \\N{EM DASH} "', '    "b\\x4"', '    "1 cc \\n"'],
+            ['    f"aa {bb"', '    f"} cc"'],
+            ['    "aa \\"', '    "n bb"'],
+            ['"aa bb "', 'f"{cc} dd"'],
+            ['    "aa " b"', '    "cc"'],
+        ]
+
+        def wrap(func, *args):
+            try:
+                return func(*args)
+            except Exception as err:
+                return type(err)
+
+        for lines in blocks:
+            for width in (5, 20, 79):
+                for engine in ("greedy", "optimal"):
+                    with self.subTest(lines=lines, width=width, engine=engine):
+                        unwrapped = wrapper._string_unwrap(lines)
+                        self.assertEqual(
+                            wrap(wrapper._string_rewrap, lines, width, engine),
+                            wrap(
+                                wrapper._string_wrap,
+                                unwrapped[0],
+                                width,
+                                engine,
+                            ),
+                        )
+
+
+class ResultCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        cache_clear()
+
+    def tearDown(self):
+        set_cache_size(128)
+        cache_clear()
+
+    def test_cache_1(self):
+        lines = [
+            '                        f"Can\'t disambiguate {values} to {self._enum.__name__} "',
+            '                        "member"',
+        ]
+        first = string_rewrap(lines, 79)
+        first.append("modified")
+        second = string_rewrap(lines, 79)
+        self.assertEqual(second, string_rewrap(lines, 79))
+        self.assertEqual(first[:-1], second)
+        self.assertEqual(cache_info().hits, 2)
+        self.assertEqual(cache_info().misses, 1)
+        self.assertEqual(cache_info().currsize, 1)
+
+        self.assertIsNotNone(string_unwrap(lines))
+        self.assertIsNotNone(string_rewrap(lines, 60))
+        self.assertEqual(cache_info().currsize, 3)
+
+        cache_clear()
+        self.assertEqual(cache_info(), (0, 0, 128, 0))
+
+    def test_cache_2(self):
+        # Failures are not cached, so the error is reported every time
+        set_cache_size(1)
+        for _ in range(2):
+            buf = io.StringIO()
+            with contextlib.redirect_stderr(buf):
+                self.assertIsNone(string_wrap('foo("text here")', 79))
+            self.assertIn("not on its own line", buf.getvalue())
+
+        string_wrap('    "a b"', 79)
+        string_wrap('    "c d"', 79)
+        self.assertEqual(cache_info().currsize, 1)
+        string_wrap('    "c d"', 79)
+        self.assertEqual(cache_info().hits, 1)
+
+
+class BatchTestCase(unittest.TestCase):
+    maxDiff = None
+
+    def test_wrap_many_1(self):
+        lines = [
+            '    "aaa bbb ccc ddd",',
+            'foo("text here")',
+            '    f"a {b",',
+            '    "aaa bbb ccc ddd",',
+        ]
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            results = wrap_many(lines, [14, 79, 79, 79])
+        self.assertEqual(stderr.getvalue(), "")
+        self.assertEqual(
+            [r.lines for r in results],
+            [
+                ['    "aaa bbb "', '    "ccc ddd",'],
+                None,
+                None,
+                ['    "aaa bbb ccc ddd",'],
+            ],
+        )
+        self.assertIn("not on its own line", results[1].error)
+        self.assertTrue(results[2].error)
+        for line, width, result in zip(lines, [14, 79, 79, 79], results):
+            if result.error is None:
+                self.assertEqual(result.lines, string_wrap(line, width))
+
+    def test_wrap_many_2(self):
+        with self.assertRaises(ValueError):
+            wrap_many(['    "a"'], 79, engine="unknown")
+        with self.assertRaises(ValueError):
+            wrap_many(['    "a"', '    "b"'], [79])
+        self.assertEqual(wrap_many([], 79), [])
+
+    def test_wrap_many_3(self):
+        line = '    "aaa bbb ccc ddd",'
+        first, second = wrap_many([line, line], 14)
+        self.assertEqual(first, second)
+        self.assertIsNot(first.lines, second.lines)
+
+    def test_rewrap_many(self):
+        blocks = [
+            ['    "aaa "', '    "bbb"'],
+            ['    f"aaa {b} "', '    "{c}"'],
+        ]
+        results = rewrap_many(blocks, 79, engine="optimal")
+        self.assertEqual(
+            results,
+            [
+                (['    "aaa bbb"'], None),
+                (['    f"aaa {b} {{c}}"'], None),
+            ],
+        )
+        results = rewrap_many([[], blocks[0]], 79)
+        self.assertIsNone(results[0].lines)
+        self.assertIn("no lines", results[0].error)
+        self.assertEqual(results[1], (['    "aaa bbb"'], None))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import time
+import types
+import unittest
+
+from unittest import mock
+
+from string_wrap import vim_bridge
+
+
+class FakeBuffer(list):
+    """Minimal stand-in for a vim.Buffer that records the writes"""
+
+    def __init__(self, lines):
+        super().__init__(lines)
+        self.writes = []
+
+    def __setitem__(self, key, value):
+        self.writes.append((key, value))
+        super().__setitem__(key, value)
+
+    def append(self, lines, nr=None):
+        if isinstance(lines, str):
+            lines = [lines]
+        if nr is None:
+            nr = len(self)
+        self[nr:nr] = lines
+
+
+class VimBridgeTestCase(unittest.TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        self.buf = FakeBuffer(
+            [
+                "raise ValueError(",
+                '    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor"',
+                ")",
+            ]
+        )
+        fake_vim = types.SimpleNamespace(
+            current=types.SimpleNamespace(buffer=self.buf)
+        )
+        patcher = mock.patch.object(vim_bridge, "vim", fake_vim)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_wrap_unwrap(self):
+        original = list(self.buf)
+        self.assertTrue(vim_bridge.wrap_line(2, 60, "greedy"))
+        self.assertEqual(
+            self.buf,
+            [
+                "raise ValueError(",
+                '    "Lorem ipsum dolor sit amet, consectetur adipiscing "',
+                '    "elit, sed do eiusmod tempor"',
+                ")",
+            ],
+        )
+        self.assertTrue(vim_bridge.unwrap_lines(2, 3))
+        self.assertEqual(self.buf, original)
+
+    def test_rewrap(self):
+        self.assertTrue(vim_bridge.rewrap_lines(2, 2, 60, "optimal"))
+        self.assertEqual(
+            self.buf,
+            [
+                "raise ValueError(",
+                '    "Lorem ipsum dolor sit amet, consectetur "',
+                '    "adipiscing elit, sed do eiusmod tempor"',
+                ")",
+            ],
+        )
+
+    def test_errors(self):
+        original = list(self.buf)
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            self.assertFalse(vim_bridge.wrap_line(1, 60, "greedy"))
+            self.assertFalse(vim_bridge.rewrap_lines(2, 2, 60, "unknown"))
+        self.assertEqual(self.buf, original)
+        self.assertIn("Unknown wrapping engine", stderr.getvalue())
+
+    def test_invalid_fields(self):
+        self.buf[1:3] = ['    f"aaaa bbbb {a"', '    f"aaaa bbbb {a b}"']
+        original = list(self.buf)
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            self.assertFalse(vim_bridge.wrap_line(2, 10, "greedy"))
+            self.assertFalse(vim_bridge.rewrap_lines(3, 3, 10, "greedy"))
+        self.assertEqual(self.buf, original)
+        self.assertIn("unterminated replacement field", stderr.getvalue())
+        self.assertEqual(stderr.getvalue().count("[StringWrap] ERROR"), 2)
+
+    def test_wrap_all(self):
+        self.buf[:] = [
+            "x = (",
+            '    "Lorem ipsum dolor sit amet, consectetur adipiscing elit",',
+            '    "short",',
+            '    "sed do eiusmod tempor incididunt ut labore et dolore magna"',
+            ")",
+            '"Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do"',
+        ]
+        self.assertEqual(vim_bridge.wrap_all(40, "greedy"), 2)
+        self.assertEqual(
+            self.buf,
+            [
+                "x = (",
+                '    "Lorem ipsum dolor sit amet, "',
+                '    "consectetur adipiscing elit",',
+                '    "short",',
+                '    "sed do eiusmod tempor incididunt "',
+                '    "ut labore et dolore magna"',
+                ")",
+                '"Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do"',
+            ],
+        )
+        self.assertEqual(vim_bridge.wrap_all(40, "greedy"), 0)
+
+    def test_minimal_writes(self):
+        self.buf[:] = [
+            "x = (",
+            '    "Lorem ipsum dolor sit amet, "',
+            '    "consectetur adipiscing elit, "',
+            '    "sed do eiusmod tempor"',
+            ")",
+        ]
+        self.buf.writes.clear()
+        self.assertTrue(vim_bridge.rewrap_lines(2, 4, 40, "greedy"))
+        self.assertEqual(
+            self.buf.writes,
+            [
+                (
+                    slice(2, 4),
+                    [
+                        '    "consectetur adipiscing elit, sed "',
+                        '    "do eiusmod tempor"',
+                    ],
+                )
+            ],
+        )
+        self.buf.writes.clear()
+        self.assertTrue(vim_bridge.rewrap_lines(2, 4, 40, "greedy"))
+        self.assertEqual(self.buf.writes, [])
+
+    def test_changed_range(self):
+        self.assertEqual(vim_bridge.changed_range([], []), (0, 0, 0))
+        self.assertEqual(vim_bridge.changed_range(["a"], ["a"]), (1, 1, 1))
+        self.assertEqual(
+            vim_bridge.changed_range(["a", "b", "c"], ["a", "x", "y", "c"]),
+            (1, 2, 3),
+        )
+        self.assertEqual(
+            vim_bridge.changed_range(["a", "a"], ["a", "a", "a"]), (2, 2, 3)
+        )
+
+    def test_async(self):
+        def wait(job_id):
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline:
+                response = vim_bridge.poll(job_id)
+                if response is not None:
+                    return response
+                time.sleep(0.01)
+            self.fail("job didn't finish")
+
+        job_id = vim_bridge.submit(
+            "rewrap", lines=self.buf[1:2], text_width=60, engine="greedy"
+        )
+        self.assertEqual(
+            wait(job_id),
+            {
+                "result": [
+                    '    "Lorem ipsum dolor sit amet, consectetur adipiscing "',
+                    '    "elit, sed do eiusmod tempor"',
+                ]
+            },
+        )
+        self.assertIn("Unknown job", vim_bridge.poll(job_id)["error"])
+
+        job_id = vim_bridge.submit("unwrap", lines=["x = 1"])
+        self.assertIn("couldn't identify", wait(job_id)["error"])
+
+        job_id = vim_bridge.submit("wrap", text_width=60)
+        self.assertIn("Internal error: TypeError", wait(job_id)["error"])
+
+        job_id = vim_bridge.submit(
+            "wrap_all", lines=list(self.buf), text_width=60, engine="optimal"
+        )
+        self.assertEqual(wait(job_id)["result"][0][0], 1)
+        self.assertFalse(vim_bridge.cancel(job_id))
+
+    def test_engines(self):
+        self.assertIn("optimal", vim_bridge.engines())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+import unicodedata
+import unittest
+
+from string_wrap import _width_table
+from string_wrap.width import char_width
+from string_wrap.width import display_width
+from string_wrap.width import is_narrow
+from string_wrap.width import make_table
+from string_wrap.width import unicode_width
+
+
+class WidthTestCase(unittest.TestCase):
+    def test_char_width(self):
+        cases = [
+            ("a", 1),
+            ("é", 1),
+            ("\u0301", 0),
+            ("\u200b", 0),
+            ("\u00ad", 1),
+            ("漢", 2),
+            ("ア", 2),
+            ("ｱ", 1),
+            ("Ａ", 2),
+            ("한", 2),
+            ("\u1161", 0),
+            ("😀", 2),
+            ("\uffff", 1),
+        ]
+        for char, width in cases:
+            with self.subTest(char=char):
+                self.assertEqual(char_width(char), width)
+                self.assertEqual(unicode_width(ord(char)), width)
+
+    def test_display_width(self):
+        self.assertEqual(display_width(""), 0)
+        self.assertEqual(display_width("abc def"), 7)
+        self.assertEqual(display_width("漢字 テスト"), 11)
+        self.assertEqual(display_width("cafe\u0301"), 4)
+
+    def test_is_narrow(self):
+        self.assertTrue(is_narrow("abc"))
+        self.assertTrue(is_narrow("café naïve"))
+        self.assertFalse(is_narrow("cafe\u0301"))
+        self.assertFalse(is_narrow("漢字"))
+
+    @unittest.skipIf(
+        unicodedata.unidata_version != _width_table.UNICODE_VERSION,
+        "The table is made from another Unicode version",
+    )
+    def test_table(self):
+        starts, widths = make_table()
+        self.assertEqual(tuple(starts), _width_table.STARTS)
+        self.assertEqual(widths, _width_table.WIDTHS)
+
+
+if __name__ == "__main__":
+    unittest.main()